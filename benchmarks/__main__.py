@@ -0,0 +1,88 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from benchmarks.runner import compare, save
+from benchmarks.suite import BENCHMARKS, BUDGETS, Fixture
+
+
+BASELINE = Path(__file__).parent / "baseline.json"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="Ceres benchmarks"
+    )
+    parser.add_argument("benchmarks", nargs="*", help="benchmarks to run, all if empty")
+    parser.add_argument("-n", "--iterations", type=int, default=10000)
+    parser.add_argument(
+        "--rate", type=float, help="books per second of every fake exchange"
+    )
+    parser.add_argument("--json", action="store_true", help="print results as json")
+    parser.add_argument(
+        "--save", nargs="?", const=BASELINE, type=Path, help="write results as baseline"
+    )
+    parser.add_argument(
+        "--compare", nargs="?", const=BASELINE, type=Path, help="compare to baseline"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed slowdown against the baseline as fraction",
+    )
+    parser.add_argument(
+        "--min-delta",
+        type=float,
+        default=1.0,
+        help="ignore slowdowns below this many microseconds",
+    )
+    args = parser.parse_args()
+
+    names = args.benchmarks or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks {*unknown,}, choose from {*BENCHMARKS,}")
+
+    fixture = Fixture(args.rate)
+    results = {}
+    try:
+        for name in names:
+            results[name] = BENCHMARKS[name](fixture, args.iterations)
+            if not args.json:
+                r = results[name]
+                print(
+                    f"{name:<24} p50 {r['p50_us']:>10.2f} us  p99 {r['p99_us']:>10.2f} us  {r['ops_per_sec']:>12.0f} ops/s"
+                )
+    finally:
+        fixture.handler.close()
+    if args.json:
+        print(json.dumps(results, indent=4))
+    over_budget = [
+        name
+        for name, r in results.items()
+        if name in BUDGETS and r["p50_us"] > BUDGETS[name]
+    ]
+    for name in over_budget:
+        print(
+            f"OVER BUDGET {name} p50: {results[name]['p50_us']:.2f} > {BUDGETS[name]:.2f} us",
+            file=sys.stderr,
+        )
+    if args.save:
+        save(results, args.save)
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance, args.min_delta)
+        for r in regressions:
+            print(
+                f"REGRESSION {r['benchmark']} {r['metric']}: {r['baseline']:.2f} -> {r['current']:.2f} us",
+                file=sys.stderr,
+            )
+        if regressions:
+            sys.exit(1)
+    if over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+import ccxt.pro as ccxt
+import numpy as np
+from ccxt.base.decimal_to_precision import TICK_SIZE
+
+
+class FakeExchange:
+    """
+    In-process stand-in for a ccxt.pro exchange. watch_order_book and
+    watch_order_book_for_symbols return synthetic books around a random
+    walk, at most rate books per second (unlimited if rate is None). Every
+    book carries its creation time from time.perf_counter_ns as nonce, so
+    consumers can measure delivery latency.
+    """
+
+    id = "fake"
+    name = "Fake"
+    symbols: List[str] = ["BTC/USDT"]
+    rate: Optional[float] = None
+    depth = 50
+    spread = 0.0005
+    taker = 0.001
+    seed = 0
+    precisionMode = TICK_SIZE
+    has = {
+        "watchOrderBook": True,
+        "watchOrderBookForSymbols": True,
+        "fetchBalance": True,
+        "createOrder": True,
+    }
+
+    def __init__(self, config=None) -> None:
+        self.markets: Dict[str, Any] = {}
+        self.currencies: Dict[str, Any] = {}
+        self._random = np.random.default_rng(self.seed)
+        self._mid = {symbol: 100.0 for symbol in self.symbols}
+        self._last = 0.0
+        self._next: Dict[tuple, int] = {}
+        self._ladder = np.arange(self.depth) * 0.01
+
+    async def load_markets(self, reload=False):
+        if not self.markets:
+            self.set_markets(
+                {
+                    symbol: {
+                        "symbol": symbol,
+                        "base": symbol.split("/")[0],
+                        "quote": symbol.split("/")[1],
+                        "spot": True,
+                        "active": True,
+                        "taker": self.taker,
+                        "maker": self.taker,
+                        "precision": {"price": 0.01, "amount": 0.0001},
+                        "limits": {"amount": {"min": 0.0001}, "cost": {"min": 1}},
+                    }
+                    for symbol in self.symbols
+                }
+            )
+        return self.markets
+
+    def set_markets(self, markets, currencies=None):
+        self.markets = markets
+        self.currencies = currencies or {}
+        return markets
+
+    def order_book(self, symbol: str) -> Dict[str, Any]:
+        mid = self._mid[symbol] * (1 + self._random.normal(0, 0.0002))
+        self._mid[symbol] = mid
+        sizes = self._random.uniform(0.01, 2.0, (2, self.depth))
+        bids = np.column_stack((mid * (1 - self.spread) - self._ladder, sizes[0]))
+        asks = np.column_stack((mid * (1 + self.spread) + self._ladder, sizes[1]))
+        return {
+            "symbol": symbol,
+            "bids": bids.tolist(),
+            "asks": asks.tolist(),
+            "timestamp": int(time.time() * 1000),
+            "nonce": time.perf_counter_ns(),
+        }
+
+    async def watch_order_book(self, symbol, limit=None, params={}):
+        if self.rate:
+            wait = self._last + 1 / self.rate - time.perf_counter()
+            await asyncio.sleep(max(0.0, wait))
+            self._last = time.perf_counter()
+        else:
+            await asyncio.sleep(0)
+        return self.order_book(symbol)
+
+    async def watch_order_book_for_symbols(self, symbols, limit=None, params={}):
+        """
+        Books of the symbols in turn, as if they all shared one connection
+        """
+        key = tuple(symbols)
+        self._next[key] = (self._next.get(key, -1) + 1) % len(symbols)
+        return await self.watch_order_book(symbols[self._next[key]], limit, params)
+
+    async def fetch_ticker(self, symbol, params={}):
+        book = self.order_book(symbol)
+        return {"symbol": symbol, "bid": book["bids"][0][0], "ask": book["asks"][0][0]}
+
+    async def fetch_balance(self, params={}):
+        balance: Dict[str, Any] = {"info": {}}
+        for symbol in self.symbols:
+            for coin in symbol.split("/"):
+                balance[coin] = {"free": 1000.0, "used": 0.0, "total": 1000.0}
+        return balance
+
+    async def create_order(self, symbol, type, side, amount, price=None, params={}):
+        return {
+            "id": str(time.perf_counter_ns()),
+            "symbol": symbol,
+            "type": type,
+            "side": side,
+            "amount": amount,
+            "price": price,
+            "filled": amount,
+            "remaining": 0.0,
+            "status": "closed",
+        }
+
+    async def cancel_order(self, id, symbol=None, params={}):
+        return {"id": id, "status": "canceled"}
+
+    async def close(self):
+        pass
+
+
+def install(name: str, **attributes) -> str:
+    """
+    Register a FakeExchange subclass as ccxt.pro exchange, so Exchange and
+    ExchangesHandler create it from a config entry with this name
+    """
+    cls = type(
+        f"Fake{name.capitalize()}",
+        (FakeExchange,),
+        {"id": name, "name": name.capitalize(), **attributes},
+    )
+    setattr(ccxt, name, cls)
+    return name
@@ -0,0 +1,95 @@
+import asyncio
+import inspect
+import json
+import platform
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+
+def summarize(samples: List[float], elapsed: float) -> Dict[str, float]:
+    """
+    :param samples: duration of every call in seconds
+    :param elapsed: wall time of all calls in seconds
+    """
+    us = np.asarray(samples) * 1e6
+    return {
+        "iterations": len(samples),
+        "p50_us": float(np.percentile(us, 50)),
+        "p99_us": float(np.percentile(us, 99)),
+        "mean_us": float(us.mean()),
+        "ops_per_sec": len(samples) / elapsed if elapsed else 0.0,
+    }
+
+
+def measure(fn: Callable, iterations: int = 10000, warmup: int = 100):
+    """
+    Time every call of fn, coroutine functions are awaited in one event loop
+    """
+    if inspect.iscoroutinefunction(fn):
+        return asyncio.run(_measure_async(fn, iterations, warmup))
+    for _ in range(warmup):
+        fn()
+    samples = []
+    clock = time.perf_counter
+    start = clock()
+    for _ in range(iterations):
+        t = clock()
+        fn()
+        samples.append(clock() - t)
+    return summarize(samples, clock() - start)
+
+
+async def _measure_async(fn: Callable, iterations: int, warmup: int):
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    clock = time.perf_counter
+    start = clock()
+    for _ in range(iterations):
+        t = clock()
+        await fn()
+        samples.append(clock() - t)
+    return summarize(samples, clock() - start)
+
+
+def environment() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "numpy": np.__version__,
+    }
+
+
+def save(results: Dict[str, Dict[str, float]], path: Path) -> None:
+    with Path(path).open(mode="w") as file:
+        json.dump({"environment": environment(), "results": results}, file, indent=4)
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    path: Path,
+    tolerance: float,
+    min_delta_us: float = 1.0,
+) -> List[Dict[str, Any]]:
+    """
+    Compare p50 and p99 against a saved baseline. Differences below
+    min_delta_us are timer noise on sub-microsecond calls and are ignored.
+    :return: regressions slower than the baseline by more than tolerance
+    """
+    with Path(path).open() as file:
+        baseline = json.load(file)["results"]
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for key in ("p50_us", "p99_us"):
+            old, new = baseline[name][key], result[key]
+            if new > old * (1 + tolerance) and new - old > min_delta_us:
+                regressions.append(
+                    {"benchmark": name, "metric": key, "baseline": old, "current": new}
+                )
+    return regressions
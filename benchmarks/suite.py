@@ -0,0 +1,151 @@
+import asyncio
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.fakeexchange import install
+from benchmarks.runner import measure, summarize
+from ceres.balances import Balances
+from ceres.dashboard import HeadlessDashboard
+from ceres.exchange import ExchangesHandler, OrderBookEngine
+from ceres.exchange.exchangehelpers import CircuitBreaker, RetryPolicy, retrier
+from ceres.orderbook import OrderBook
+from ceres.spotarbitrage import SpotArbitrage
+from ceres.utils import generate_table
+
+
+EXCHANGES = ["fakea", "fakeb", "fakec", "faked"]
+SYMBOL = "BTC/USDT"
+
+
+class Fixture:
+    """
+    ExchangesHandler, Balances and SpotArbitrage on top of fake exchanges
+    producing at most rate books per second each
+    """
+
+    def __init__(self, rate: Optional[float] = None) -> None:
+        for seed, name in enumerate(EXCHANGES):
+            install(name, rate=rate, seed=seed, symbols=[SYMBOL])
+        self.config = {
+            "dry": True,
+            "dry_balance": 1000,
+            "order_size": 0,
+            "symbol": SYMBOL,
+            "quorum": 2,
+            "exchanges": [{"name": name} for name in EXCHANGES],
+            "market_cache": {"enabled": False},
+        }
+        self.handler = ExchangesHandler(self.config)
+        self.wallets = Balances(self.config, self.handler)
+        self.strategy = SpotArbitrage(
+            self.config, self.handler, HeadlessDashboard(), self.wallets
+        )
+
+    def order_books(self, crossed: bool = False) -> Dict[str, OrderBook]:
+        books = {}
+        for i, ex in enumerate(EXCHANGES):
+            ob = self.handler.exchanges[ex].api.order_book(SYMBOL)
+            if crossed and i == 1:
+                # lift the second exchange above the others so books cross
+                for side in ("bids", "asks"):
+                    ob[side] = [[price * 1.01, amount] for price, amount in ob[side]]
+            books[ex] = OrderBook(SYMBOL)
+            books[ex].update(ob)
+        return books
+
+
+def bench_check_profit(fixture: Fixture, iterations: int):
+    fixture.strategy.get_orderbook_data(fixture.order_books(), EXCHANGES)
+    return measure(lambda: fixture.strategy.check_profit(EXCHANGES), iterations)
+
+
+def bench_check_profit_crossed(fixture: Fixture, iterations: int):
+    fixture.strategy.get_orderbook_data(fixture.order_books(crossed=True), EXCHANGES)
+    return measure(lambda: fixture.strategy.check_profit(EXCHANGES), iterations)
+
+
+def bench_generate_table(fixture: Fixture, iterations: int):
+    books = fixture.order_books()
+    quotes = {ex: (book.best_bid, book.best_ask) for ex, book in books.items()}
+    return measure(lambda: generate_table(quotes), iterations)
+
+
+def bench_watch_order_books(fixture: Fixture, iterations: int):
+    return measure(
+        lambda: fixture.handler.watch_order_books(SYMBOL), iterations // 10, 10
+    )
+
+
+def bench_retrier(fixture: Fixture, iterations: int):
+    class Owner:
+        retry_policy = RetryPolicy()
+        breaker = CircuitBreaker("bench", retry_policy)
+
+        @retrier
+        async def call(self):
+            return None
+
+    owner = Owner()
+    return measure(owner.call, iterations)
+
+
+def bench_balances_get_free(fixture: Fixture, iterations: int):
+    return measure(lambda: fixture.wallets.get_free(EXCHANGES[0], "USDT"), iterations)
+
+
+def bench_engine_stream(fixture: Fixture, iterations: int):
+    """
+    Order book updates streamed through the OrderBookEngine, latency from
+    creation of the book in the fake exchange to the strategy callback
+    """
+    engine: OrderBookEngine
+    samples: List[float] = []
+    done = asyncio.Event()
+
+    async def on_update(exchange, symbol, fresh):
+        created = engine.store.get(exchange, symbol).nonce
+        samples.append((time.perf_counter_ns() - created) / 1e9)
+        if len(samples) >= iterations:
+            done.set()
+
+    async def stream():
+        task = asyncio.create_task(engine.run())
+        await done.wait()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    engine = OrderBookEngine(fixture.config, fixture.handler, [SYMBOL], on_update)
+    start = time.perf_counter()
+    fixture.handler.loop.run_until_complete(stream())
+    return summarize(samples, time.perf_counter() - start)
+
+
+def bench_cli_startup(fixture: Fixture, iterations: int):
+    """
+    Wall time of a fresh `ceres --help` process, at most 20 runs
+    """
+    command = [sys.executable, "-m", "ceres", "--help"]
+    return measure(
+        lambda: subprocess.run(command, check=True, stdout=subprocess.DEVNULL),
+        min(iterations, 20),
+        warmup=2,
+    )
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    "check_profit": bench_check_profit,
+    "check_profit_crossed": bench_check_profit_crossed,
+    "generate_table": bench_generate_table,
+    "watch_order_books": bench_watch_order_books,
+    "retrier": bench_retrier,
+    "balances_get_free": bench_balances_get_free,
+    "engine_stream": bench_engine_stream,
+    "cli_startup": bench_cli_startup,
+}
+
+# upper bound for p50 in microseconds, independent of the baseline
+BUDGETS: Dict[str, float] = {
+    "cli_startup": 300_000,
+}
@@ -0,0 +1,247 @@
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple
+
+import numpy as np
+
+from ceres.balances import Balances
+from ceres.dashboard import HeadlessDashboard
+from ceres.exchange.marketcache import MarketCache
+from ceres.exchange.orderbookengine import QuoteStore
+from ceres.exchange.simulator import FillSimulator
+from ceres.recorder import read_ticks
+from ceres.spotarbitrage import SpotArbitrage
+
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayExchangesHandler:
+    """
+    Stand-in for ExchangesHandler during a replay. Serves the markets of the
+    recorded exchanges from the market cache, or default fees if not cached.
+    """
+
+    def __init__(self, config, exchanges: List[str], symbol: str) -> None:
+        self._config = config
+        self.symbol = symbol
+        self.exchanges_list = exchanges
+        self.exchanges: Dict[str, Any] = {}
+        self.markets = self._load_markets()
+
+    @property
+    def current_exchanges(self):
+        return self.exchanges_list
+
+    def available_exchanges(self):
+        return self.exchanges_list
+
+    def get_markets(self):
+        return self.markets
+
+    def add_markets_listener(self, callback):
+        pass
+
+    def _load_markets(self):
+        cache = MarketCache(self._config)
+        fee = self._config.get("backtest", {}).get("fee", 0.001)
+        markets = {}
+        for ex in self.exchanges_list:
+            entry = cache.get(ex)
+            market = entry["markets"].get(self.symbol) if entry else None
+            markets[ex] = {self.symbol: market or {"taker": fee, "maker": fee}}
+        return markets
+
+
+class PendingLeg(NamedTuple):
+    due: float
+    exchange: str
+    order: Dict[str, Any]
+    trade: int
+
+
+class Backtester:
+    """
+    Replays recorded tick files through SpotArbitrage as fast as possible or,
+    with speed > 0, scaled to speed times the recorded pace. Both legs of an
+    opportunity above min_profit are filled by the FillSimulator against the
+    recorded book once the sampled latency has passed in replay time.
+    """
+
+    def __init__(self, config, files: List[Path], symbol=None, speed=0.0) -> None:
+        self.symbol = symbol or config.get("symbol")
+        self._config = {**config, "dry": True, "symbol": self.symbol}
+        self.files = sorted(files)
+        self.speed = speed
+        self.quorum = self._config.get("quorum", 2)
+        self.min_profit = self._config.get("min_profit", 0)
+        self.now = 0.0
+        exchanges = self._get_exchanges()
+        self.exchangeshandler = ReplayExchangesHandler(
+            self._config, exchanges, self.symbol
+        )
+        self.store = QuoteStore(
+            self._config.get("max_quote_age", 5),
+            self._config.get("orderbook_depth", 50),
+            clock=lambda: self.now,
+            wall_clock=lambda: self.now,
+            offset_window=self._config.get("clock_offset_window", 60),
+        )
+        self.wallets = Balances(self._config, self.exchangeshandler)
+        self.simulator = FillSimulator(
+            self._config, self.store.get, self.exchangeshandler.get_markets()
+        )
+        self.time_in_force = self._config.get("time_in_force", "IOC")
+        self.pending: List[PendingLeg] = []
+        self._legs: Dict[int, Dict[str, Any]] = {}
+        self.strategy = SpotArbitrage(
+            self._config, self.exchangeshandler, HeadlessDashboard(), self.wallets
+        )
+        self.updates = 0
+        self.opportunities = 0
+        self.trades = 0
+        self.total_profit = 0.0
+        self.unhedged = 0.0
+
+    def _get_exchanges(self) -> List[str]:
+        exchanges: List[str] = []
+        for path in self.files:
+            _, header = read_ticks(path)
+            if self.symbol in header["symbols"]:
+                exchanges += [ex for ex in header["exchanges"] if ex not in exchanges]
+        return exchanges
+
+    def run(self) -> Dict[str, Any]:
+        start = time.perf_counter()
+        first_ts = None
+        for path in self.files:
+            ticks, header = read_ticks(path)
+            if self.symbol not in header["symbols"]:
+                continue
+            # plain ndarray views avoid the memmap overhead on every index
+            ticks = np.asarray(ticks)
+            names = header["exchanges"]
+            exchange_ids = ticks["exchange"]
+            receive_ts = ticks["receive_ts"]
+            exchange_ts = ticks["exchange_ts"]
+            bids, asks = ticks["bids"], ticks["asks"]
+            symbol_id = header["symbols"].index(self.symbol)
+            for i in np.flatnonzero(ticks["symbol"] == symbol_id):
+                self.now = receive_ts[i] / 1e9
+                if first_ts is None:
+                    first_ts = self.now
+                if self.speed > 0:
+                    delay = (self.now - first_ts) / self.speed
+                    delay -= time.perf_counter() - start
+                    if delay > 0:
+                        time.sleep(delay)
+                self._on_tick(
+                    names[exchange_ids[i]], bids[i], asks[i], int(exchange_ts[i])
+                )
+        return self._report(time.perf_counter() - start, first_ts)
+
+    def _on_tick(self, exchange, bids, asks, timestamp) -> None:
+        bids = bids[~np.isnan(bids[:, 0])]
+        asks = asks[~np.isnan(asks[:, 0])]
+        if not len(bids) or not len(asks):
+            return
+        self.updates += 1
+        self.store.update(
+            exchange, self.symbol, {"bids": bids, "asks": asks, "timestamp": timestamp}
+        )
+        if self.pending:
+            # like the executor, no new trade while legs are in flight
+            self._settle()
+            return
+        fresh = self.store.fresh_exchanges(
+            self.symbol, self.exchangeshandler.current_exchanges
+        )
+        if len(fresh) < self.quorum:
+            return
+        obs = {ex: self.store.get(ex, self.symbol) for ex in fresh}
+        signal, opportunities = self.strategy.check_opportunity(obs, fresh)
+        if not signal:
+            return
+        self.opportunities += len(opportunities)
+        for trade, orders in enumerate(opportunities):
+            if orders["profit"]["profit"] > self.min_profit:
+                self._fill(trade, orders)
+
+    def _fill(self, trade, orders) -> None:
+        self.trades += 1
+        for ex, order in orders["exchange_orders"].items():
+            due = self.now + self.simulator.sample_latency(ex)
+            self.pending.append(PendingLeg(due, ex, order, trade))
+
+    def _settle(self) -> None:
+        """
+        Fill the legs whose latency has passed against the current book
+        """
+        params = {"timeInForce": self.time_in_force} if self.time_in_force else {}
+        waiting = []
+        for leg in self.pending:
+            if leg.due > self.now:
+                waiting.append(leg)
+                continue
+            ex, order = leg.exchange, leg.order
+            response = self.simulator.fill(
+                ex,
+                self.symbol,
+                order["type"],
+                order["side"],
+                order["amount"],
+                order["price"],
+                params,
+            )
+            self._legs.setdefault(leg.trade, {})[order["side"]] = response
+            if response["filled"]:
+                self.wallets.apply_fill(
+                    ex,
+                    self.symbol,
+                    order["side"],
+                    response["filled"],
+                    response["average"],
+                    response["fee"]["cost"],
+                )
+        self.pending = waiting
+        if not self.pending:
+            self._book_profit()
+
+    def _book_profit(self) -> None:
+        """
+        Profit of the hedged amount, the remainder is counted as unhedged
+        """
+        for legs in self._legs.values():
+            buy, sell = legs.get("buy"), legs.get("sell")
+            if not buy or not sell:
+                continue
+            hedged = min(buy["filled"], sell["filled"])
+            if hedged:
+                buy_cost = (buy["cost"] + buy["fee"]["cost"]) / buy["filled"]
+                sell_proceeds = (sell["cost"] - sell["fee"]["cost"]) / sell["filled"]
+                self.total_profit += hedged * (sell_proceeds - buy_cost)
+            self.unhedged += buy["filled"] - sell["filled"]
+        self._legs = {}
+
+    def _report(self, elapsed: float, first_ts) -> Dict[str, Any]:
+        return {
+            "symbol": self.symbol,
+            "exchanges": self.exchangeshandler.current_exchanges,
+            "updates": self.updates,
+            "replayed_seconds": (self.now - first_ts) if first_ts else 0,
+            "elapsed_seconds": elapsed,
+            "updates_per_second": self.updates / elapsed if elapsed else 0,
+            "opportunities": self.opportunities,
+            "trades": self.trades,
+            "total_profit": self.total_profit,
+            "unhedged": self.unhedged,
+            "balances": repr(self.wallets),
+        }
+
+
+def find_tick_files(path) -> List[Path]:
+    path = Path(path)
+    if path.is_dir():
+        return sorted(path.glob("*.bin"))
+    return [path]
@@ -1,6 +1,9 @@
+import asyncio
 import copy
 import logging
-from typing import NamedTuple
+from typing import Dict, NamedTuple, Tuple
+
+from ceres.depth import buy_cost
 
 
 logger = logging.getLogger(__name__)
@@ -14,11 +17,27 @@ class Asset(NamedTuple):
 
 
 class Balances:
-    def __init__(self, config, exchangeshandler) -> None:
+    """
+    Balances per exchange and currency. In live mode they are kept up to date
+    by run(): from watch_balance on exchanges that stream balances, from
+    fetch_balance every reconcile_interval seconds or after own orders on the
+    others. Own orders change the balances right away, reserve moves the
+    order amount from free to used when it is sent, release and apply_fill
+    book the result. Every update replaces the balance of an exchange with a
+    snapshot that may already contain own orders, so their local changes are
+    skipped if a snapshot arrived while they were in flight.
+    """
+
+    def __init__(self, config, exchangeshandler, ledger=None) -> None:
         self._config = config
         self._exchangeshandler = exchangeshandler
+        self._ledger = ledger
         self._initial_balance = {}
         self.dry: bool = self._config.get("dry", True)
+        self.reconcile_interval = self._config.get("balance_reconcile_interval", 60)
+        self.restart_delay = self._config.get("stream_restart_delay", 1)
+        self._reconcile: Dict[str, asyncio.Event] = {}
+        self._snapshots: Dict[str, int] = {}
         self._get_initial_balance()
         self._balance = copy.deepcopy(self._initial_balance)
 
@@ -28,21 +47,24 @@ class Balances:
             example of balance of a exchange
             {'BTC': {'free': 1.0, 'used': 0.0, 'total': 1.0}, 'ETH': {'free': 0.0, 'used': 0.0, 'total': 0.0}}
             """
-            bal = {}
-            for coin in self._config.get("symbol").split("/"):
-                bal[coin] = Asset(
-                    currency=coin,
-                    free=self._config.get("dry_balance"),
-                    used=0,
-                    total=self._config.get("dry_balance"),
-                )
+            stored = self._ledger.balances(self.dry) if self._ledger else {}
             for ex in self._exchangeshandler.current_exchanges:
+                bal = {}
+                for coin in self._config.get("symbol").split("/"):
+                    bal[coin] = Asset(
+                        currency=coin,
+                        free=self._config.get("dry_balance"),
+                        used=0,
+                        total=self._config.get("dry_balance"),
+                    )
+                for coin, (free, used, total) in stored.get(ex, {}).items():
+                    bal[coin] = Asset(currency=coin, free=free, used=used, total=total)
                 self._initial_balance[ex] = bal
         else:
             balances = self._exchangeshandler.get_balances()
             for ex, balance in balances.items():
                 bal = {}
-                for coin, info in balance:
+                for coin, info in balance.items():
                     bal[coin] = Asset(
                         currency=coin,
                         free=info.get("free", 0),
@@ -55,14 +77,17 @@ class Balances:
     def __repr__(self) -> str:
         return f"Wallets: {self._balance}"
 
+    def get_asset(self, exchange, currency) -> Asset:
+        return self._balance[exchange].get(currency, Asset(currency=currency))
+
     def get_free(self, exchange, currency) -> float:
-        return self._balance[exchange][currency].free
+        return self.get_asset(exchange, currency).free
 
     def get_used(self, exchange, currency) -> float:
-        return self._balance[exchange][currency].used
+        return self.get_asset(exchange, currency).used
 
     def get_total(self, exchange, currency) -> float:
-        return self._balance[exchange][currency].total
+        return self.get_asset(exchange, currency).total
 
     def get_exchanges_total(self, currency):
         total = 0
@@ -70,25 +95,146 @@ class Balances:
             total += self.get_total(ex, currency)
         return total
 
-    def update_balance(self):
+    async def update_balance(self):
         if self.dry:
-            """will need to store in a database"""
+            """dry balances change through apply_fill and are stored in the ledger"""
             pass
         else:
-            self._update_live()
+            await self._update_live()
 
-    def _update_live(self):
-        balances = self._exchangeshandler.get_balances()
+    async def _update_live(self):
+        balances = await self._exchangeshandler.fetch_balances()
         for ex, balance in balances.items():
-            bal = {}
-            for coin, info in balance:
-                bal[coin] = Asset(
-                    currency=coin,
-                    free=info.get("free", 0),
-                    used=info.get("used", 0),
-                    total=info.get("total", 0),
+            self._set_balance(ex, balance)
+
+    def _set_balance(self, ex, balance):
+        bal = {}
+        for coin, info in balance.items():
+            bal[coin] = Asset(
+                currency=coin,
+                free=info.get("free") or 0,
+                used=info.get("used") or 0,
+                total=info.get("total") or 0,
+            )
+            if self._ledger and self._balance.get(ex, {}).get(coin) != bal[coin]:
+                self._ledger.record_balance(ex, bal[coin], self.dry)
+        self._balance[ex] = bal
+        self._snapshots[ex] = self._snapshots.get(ex, 0) + 1
+
+    def snapshot(self, exchange) -> int:
+        """
+        :return: number of balance updates of the exchange so far
+        """
+        return self._snapshots.get(exchange, 0)
+
+    async def run(self):
+        """
+        Keep live balances up to date, one task per exchange
+        """
+        if self.dry:
+            return
+        self._reconcile = {
+            ex: asyncio.Event() for ex in self._exchangeshandler.current_exchanges
+        }
+        await asyncio.gather(*(self._watch(ex) for ex in self._reconcile))
+
+    async def _watch(self, exchange):
+        ex = self._exchangeshandler.exchanges[exchange]
+        streaming = ex.streams_balance
+        logger.info(
+            "Balances of %s from %s",
+            exchange,
+            "watch_balance" if streaming else "fetch_balance",
+        )
+        while True:
+            try:
+                if streaming:
+                    balance = await ex.watch_balance()
+                else:
+                    try:
+                        await asyncio.wait_for(
+                            self._reconcile[exchange].wait(), self.reconcile_interval
+                        )
+                    except asyncio.TimeoutError:
+                        pass
+                    self._reconcile[exchange].clear()
+                    balance = await ex.fetch_balance()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(
+                    "Balance update on %s failed, retrying. Message: %s", exchange, e
                 )
-            self._balance[ex] = bal
+                await asyncio.sleep(self.restart_delay)
+                continue
+            self._set_balance(exchange, balance)
+
+    def reconcile(self, exchange):
+        """
+        Fetch the balance of a polled exchange now instead of at the next interval
+        """
+        event = self._reconcile.get(exchange)
+        if event:
+            event.set()
+
+    def _change(self, exchange, currency, free=0.0, used=0.0) -> Asset:
+        asset = self.get_asset(exchange, currency)
+        asset = asset._replace(
+            free=asset.free + free,
+            used=asset.used + used,
+            total=asset.total + free + used,
+        )
+        self._balance.setdefault(exchange, {})[currency] = asset
+        return asset
+
+    def reserve(self, exchange, order, fee=0.0) -> Tuple[str, str, float, int]:
+        """
+        Move what an order can spend from free to used when it is sent
+        :param fee: taker fee rate, buys reserve the fee in quote currency too
+        :return: reservation to pass to release, with the snapshot it was made on
+        """
+        base, quote = order["symbol"].split("/")
+        if order["side"] == "buy":
+            currency, amount = quote, buy_cost(order["amount"], order["price"], fee)
+        else:
+            currency, amount = base, order["amount"]
+        self._change(exchange, currency, free=-amount, used=amount)
+        return exchange, currency, amount, self.snapshot(exchange)
+
+    def release(self, reservation: Tuple[str, str, float, int]) -> None:
+        """
+        Undo a reservation, unless a newer snapshot already replaced it
+        """
+        exchange, currency, amount, snapshot = reservation
+        if snapshot != self.snapshot(exchange):
+            return
+        self._change(exchange, currency, free=amount, used=-amount)
+
+    def apply_fill(self, exchange, symbol, side, filled, price, fee=0.0, snapshot=None):
+        """
+        Book a filled order. The fee is paid in quote currency. Live balances
+        are corrected by the next balance update, polled exchanges are asked
+        to reconcile now.
+        :param snapshot: snapshot the order was sent on, the fill is not booked
+        locally if a newer snapshot arrived since, it may contain the fill
+        """
+        if not filled:
+            return
+        if snapshot is not None and snapshot != self.snapshot(exchange):
+            self.reconcile(exchange)
+            return
+        base, quote = symbol.split("/")
+        cost = filled * price
+        if side == "buy":
+            changes = {base: filled, quote: -cost - fee}
+        else:
+            changes = {base: -filled, quote: cost - fee}
+        for currency, change in changes.items():
+            asset = self._change(exchange, currency, free=change)
+            if self._ledger and self.dry:
+                self._ledger.record_balance(exchange, asset, self.dry)
+        if not self.dry:
+            self.reconcile(exchange)
 
     def check_free_amount(self, exchange, currency, amount):
         free = self.get_free(exchange, currency)
@@ -1,7 +1,15 @@
+import asyncio
 import logging
+import time
+import uuid
 
+from ceres import __version__
 from ceres.balances import Balances
-from ceres.exchange import ExchangesHandler
+from ceres.depth import buy_cost
+from ceres.exchange import ExchangesHandler, FillSimulator, OrderBookEngine
+from ceres.execution import OrderExecutor
+from ceres.ledger import Ledger
+from ceres.metrics import LatencyMetrics
 from ceres.remote import Telegram
 from ceres.spotarbitrage import SpotArbitrage
 
@@ -17,35 +25,106 @@ class CeresBot:
             logger.info("Bot is running in dry mode")
             pass
         self.exchangeshandler = ExchangesHandler(self._config)
-        self.wallets = Balances(self._config, self.exchangeshandler)
-        self.strategy = SpotArbitrage(self._config, self.exchangeshandler, dashboard)
+        self.ledger = None
+        if self._config.get("ledger", {}).get("enabled", True):
+            self.ledger = Ledger(self._config)
+        self.wallets = Balances(self._config, self.exchangeshandler, self.ledger)
+        self.strategy = SpotArbitrage(
+            self._config, self.exchangeshandler, dashboard, self.wallets
+        )
         self.symbol = self._config.get("symbol")
         base, quote = self.symbol.split("/")
         self.base = base
         self.quote = quote
         self.total_profit = 0
         self.total_trades = 0
+        if self.ledger:
+            self.total_trades, self.total_profit = self.ledger.totals(self.wallets.dry)
+        self.heart_beat = 60
+        self.executor = OrderExecutor(
+            self._config, self.exchangeshandler, self.strategy.market_table
+        )
+        self.telegram = None
         if self._config.get("telegram", None).get("enabled", False):
             self.telegram = Telegram(self._config)
+        self.metrics = LatencyMetrics(self._config)
+        self.engine = OrderBookEngine(
+            self._config,
+            self.exchangeshandler,
+            [self.symbol],
+            self._on_order_book,
+            metrics=self.metrics,
+        )
+        if self.wallets.dry:
+            self.exchangeshandler.set_simulator(
+                FillSimulator(
+                    self._config,
+                    self.engine.store.get,
+                    self.exchangeshandler.get_markets(),
+                )
+            )
+
+    def run(self):
+        try:
+            self.exchangeshandler.loop.run_until_complete(
+                asyncio.gather(
+                    self._heartbeat(),
+                    self.metrics.run(),
+                    self.wallets.run(),
+                    self.engine.run(),
+                )
+            )
+        finally:
+            if self.telegram:
+                self.telegram.close()
+            if self.ledger:
+                self.ledger.close()
+            self.exchangeshandler.close()
 
-    def main_loop(self):
-        # bal = self.exchangeshandler.get_ticker_on_exchanges('BTC/USDT')
-        self.wallets.update_balance()
-        signal, orders = self.strategy.check_opportunity()
-        if not signal:
+    async def _heartbeat(self):
+        while True:
+            logger.info("Bot heartbeat. Running version='%s'", __version__)
+            logger.info("Exchange health: %s", self.exchangeshandler.retry_metrics())
+            logger.info("Clock offsets: %s", self.engine.store.clock_offsets())
+            await asyncio.sleep(self.heart_beat)
+
+    async def _on_order_book(self, exchange, symbol, exchanges):
+        received = self.engine.store.received_at(exchange, symbol)
+        obs = {ex: self.engine.store.get(ex, symbol) for ex in exchanges}
+        await self.main_loop(obs, exchanges, exchange, received)
+
+    async def main_loop(self, obs, exchanges, exchange=None, received=None):
+        """
+        :param exchange: exchange whose order book update triggered the loop
+        :param received: time.monotonic() when that update was received
+        """
+        signal, opportunities = self.strategy.check_opportunity(obs, exchanges)
+        decided = time.monotonic()
+        if received is None:
+            received = decided
+        else:
+            self.metrics.record("evaluate", exchange, decided - received)
+        if not signal or self.executor.busy:
             return
-        if (
-            orders.get("profit", {}).get("profit", 0)
+        opportunities = [
+            orders
+            for orders in opportunities
+            if orders.get("profit", {}).get("profit", 0)
             > self._config.get("min_profit", 0)
-        ) and (self._is_balance_enough(orders)):
-            logger.info(f"Creating orders now: {orders}")
-            self._create_orders(orders)
+            and self._is_balance_enough(orders)
+        ]
+        if opportunities:
+            logger.info("Creating orders now: %s", opportunities)
+            await self._create_orders(opportunities, decided, received)
 
     def _is_balance_enough(self, orders) -> bool:
         for ex, order in orders.get("exchange_orders").items():
             if not self._check_exchange_balance(ex, order):
                 logger.warning(
-                    f"Not placing orders. {ex} has not enough funds to {order.get('side')} {self.symbol}"
+                    "Not placing orders. %s has not enough funds to %s %s",
+                    ex,
+                    order.get("side"),
+                    self.symbol,
                 )
                 return False
         return True
@@ -53,23 +132,134 @@ class CeresBot:
     def _check_exchange_balance(self, ex, order):
         if order.get("side") == "sell":
             return self.wallets.check_free_amount(ex, self.base, order.get("amount"))
-        if order.get("side") == "sell":
+        if order.get("side") == "buy":
             return self.wallets.check_free_amount(
-                ex, self.quote, order.get("amount") * order.get("price")
+                ex,
+                self.quote,
+                buy_cost(
+                    order.get("amount"),
+                    order.get("price"),
+                    self.strategy.fees[ex]["taker"],
+                ),
             )
         return True
 
-    def _create_orders(self, orders):
-        msg = ""
-        self.total_profit += float(orders["profit"]["profit"])
-        self.total_trades += 1
-        for ex, order in orders.get("exchange_orders").items():
-            logger.info(
-                f"Placing {order['type']} {order['side']} order for {order['amount']} {self.symbol} @ {order['price']} on {ex}"
+    async def _create_orders(self, opportunities, decided, received):
+        """
+        Execute the opportunities, which use distinct exchanges, together
+        """
+        reservations = []
+        for orders in opportunities:
+            for ex, order in orders.get("exchange_orders").items():
+                logger.info(
+                    "Placing %s %s order for %s %s @ %s on %s",
+                    order["type"],
+                    order["side"],
+                    order["amount"],
+                    self.symbol,
+                    order["price"],
+                    ex,
+                )
+                reservations.append(
+                    self.wallets.reserve(ex, order, self.strategy.fees[ex]["taker"])
+                )
+        snapshots = {ex: snapshot for ex, _, _, snapshot in reservations}
+        try:
+            all_results = await self.executor.execute_all(opportunities)
+        finally:
+            for reservation in reservations:
+                self.wallets.release(reservation)
+        for orders, results in zip(opportunities, all_results):
+            self._record_latencies(results, decided, received)
+            realized = self._book_trade(orders, results, snapshots)
+            self.total_profit += realized["profit"]
+            self.total_trades += 1
+            msg = ""
+            for leg in results:
+                msg += f"{leg.order['side']} {leg.filled} of {leg.order['amount']} {self.symbol} @ {leg.order['price']} on {leg.exchange} \n"
+            msg += (
+                f"\nProfit: {realized['profit']}, planned: {orders['profit']['profit']}"
+            )
+            if realized["unhedged"]:
+                msg += f"\nUnhedged: {realized['unhedged']} {self.base}"
+            msg += f"\nTotal trades: {self.total_trades}, total profit: {self.total_profit}"
+            if self.telegram:
+                self.telegram.send_message(msg)
+
+    def _record_latencies(self, results, decided, received):
+        for leg in results:
+            if leg.corrective:
+                continue
+            self.metrics.record("submit", leg.exchange, leg.submitted - decided)
+            self.metrics.record("ack", leg.exchange, leg.latency)
+            self.metrics.record(
+                "total", leg.exchange, leg.submitted + leg.latency - received
+            )
+
+    def _book_trade(self, orders, results, snapshots=None):
+        """
+        Apply and record the fills of all legs, including corrective ones
+        :param snapshots: balance snapshot per exchange the orders were sent on
+        :return: realized trade, profit of the hedged amount like the
+        backtester books it, the remainder is unhedged
+        """
+        trade_id = uuid.uuid4().hex
+        bought = sold = buy_value = sell_value = buy_fees = sell_fees = 0.0
+        for leg in results:
+            response = leg.response or {}
+            # corrective market orders have no limit price, estimate them at the
+            # planned price of their exchange if the response has none
+            price = (
+                response.get("average")
+                or response.get("price")
+                or leg.order["price"]
+                or orders["exchange_orders"][leg.exchange]["price"]
+            )
+            fee = (response.get("fee") or {}).get("cost")
+            if fee is None:
+                fee = leg.filled * price * self.strategy.fees[leg.exchange]["taker"]
+            if leg.order["side"] == "buy":
+                bought += leg.filled
+                buy_value += leg.filled * price
+                buy_fees += fee
+            else:
+                sold += leg.filled
+                sell_value += leg.filled * price
+                sell_fees += fee
+            self.wallets.apply_fill(
+                leg.exchange,
+                self.symbol,
+                leg.order["side"],
+                leg.filled,
+                price,
+                fee,
+                snapshot=(snapshots or {}).get(leg.exchange),
+            )
+            if self.ledger:
+                self.ledger.record_fill(
+                    trade_id,
+                    leg.exchange,
+                    leg.order,
+                    leg.filled,
+                    leg.response,
+                    self.wallets.dry,
+                )
+        hedged = min(bought, sold)
+        profit = 0.0
+        if hedged:
+            buy_cost = (buy_value + buy_fees) / bought
+            sell_proceeds = (sell_value - sell_fees) / sold
+            profit = hedged * (sell_proceeds - buy_cost)
+        realized = {
+            "amount": hedged,
+            "buy_vwap": (buy_value / bought) if bought else None,
+            "sell_vwap": (sell_value / sold) if sold else None,
+            "profit": profit,
+            "fees": buy_fees + sell_fees,
+            "unhedged": bought - sold,
+        }
+        if self.ledger:
+            self.ledger.record_trade(
+                trade_id, self.symbol, orders, realized, self.wallets.dry
             )
-            msg += f"{order['side']} {order['amount']} {self.symbol} @ {order['price']} on {ex} \n"
-            # res = self.exchangeHandler.create_order(
-            #     exchange, order["type"], order["side"], order["amount"], order["price"]
-            # )
-        msg += f"\nTotal trades: {self.total_trades}, total profit: {self.total_profit}"
-        self.telegram.send_message(msg)
+        return realized
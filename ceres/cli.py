@@ -1,36 +1,85 @@
 import argparse
 import logging
-import time
 import sys
 from pathlib import Path
 from typing import List, Optional
 
-from rich.live import Live
-
 from ceres import __version__
-from ceres import dashboard
-from ceres.ceresbot import CeresBot
-from ceres.dashboard import Dashboard
+from ceres.loggers import setup_logging
 from ceres.utils import create_config, load_config
 
+# commands import what they need when they run, so --help, --version and
+# create-config do not pay for loading ccxt, rich and telegram
+
 logger = logging.getLogger(__name__)
 
 
+def get_config():
+    config = load_config()
+    setup_logging(config)
+    return config
+
+
+def get_dashboard(args, config):
+    from ceres.dashboard import Dashboard, HeadlessDashboard
+
+    if args.headless:
+        return HeadlessDashboard()
+    return Dashboard(refresh_per_second=config.get("dashboard_refresh", 0.33))
+
+
 def trade(args):
     """Start trading"""
-    dashboard = Dashboard()
-    config = load_config()
+    from ceres.ceresbot import CeresBot
+
+    config = get_config()
+    dashboard = get_dashboard(args, config)
     # logger.info("Starting ceres")
     ceresbot = CeresBot(config, dashboard)
-    heart_beat_now = 0
-    heart_beat = 60
-    with Live(dashboard.get_layout, refresh_per_second=0.33, screen=True):
-        while True:
-            now = time.time()
-            if (now - heart_beat_now) > heart_beat:
-                logger.info(f"Bot heartbeat. Running version='{__version__}'")
-                heart_beat_now = now
-            ceresbot.main_loop()
+    with dashboard.live():
+        ceresbot.run()
+
+
+def scan(args):
+    """Scan all common symbols for opportunities"""
+    from ceres.scanner import OpportunityScanner
+    from ceres.shardedscanner import ShardedScanner
+
+    config = get_config()
+    dashboard = get_dashboard(args, config)
+    processes = args.processes or config.get("scanner", {}).get("processes", 1)
+    if processes > 1:
+        scanner = ShardedScanner(config, dashboard, processes)
+    else:
+        scanner = OpportunityScanner(config, dashboard)
+    with dashboard.live():
+        scanner.run()
+
+
+def triangular(args):
+    """Look for triangular opportunities on every exchange"""
+    from ceres.triangulararbitrage import TriangularArbitrage
+
+    config = get_config()
+    dashboard = get_dashboard(args, config)
+    strategy = TriangularArbitrage(config, dashboard)
+    with dashboard.live():
+        strategy.run()
+
+
+def backtest(args):
+    """Replay recorded order books through the strategy"""
+    from ceres.backtest import Backtester, find_tick_files
+
+    config = get_config()
+    files = find_tick_files(args.data)
+    if not files:
+        print(f"No tick files found in {args.data}.")
+        sys.exit()
+    backtester = Backtester(config, files, symbol=args.symbol, speed=args.speed)
+    report = backtester.run()
+    for key, value in report.items():
+        print(f"{key}: {value}")
 
 
 def new_config(args):
@@ -66,8 +115,52 @@ def parse_arguments(sysargv):
         subparsers = parser.add_subparsers()
 
         trade_command = subparsers.add_parser("trade", help="Start trading.")
+        trade_command.add_argument(
+            "--headless", action="store_true", help="Run without dashboard."
+        )
         trade_command.set_defaults(func=trade)
 
+        scan_command = subparsers.add_parser(
+            "scan", help="Scan many symbols for opportunities without trading."
+        )
+        scan_command.add_argument(
+            "--headless", action="store_true", help="Run without dashboard."
+        )
+        scan_command.add_argument(
+            "--processes",
+            type=int,
+            help="Spread the order book streams over this many processes.",
+        )
+        scan_command.set_defaults(func=scan)
+
+        triangular_command = subparsers.add_parser(
+            "triangular",
+            help="Look for triangular opportunities on every exchange without trading.",
+        )
+        triangular_command.add_argument(
+            "--headless", action="store_true", help="Run without dashboard."
+        )
+        triangular_command.set_defaults(func=triangular)
+
+        backtest_command = subparsers.add_parser(
+            "backtest", help="Replay recorded order books through the strategy."
+        )
+        backtest_command.add_argument(
+            "--data",
+            default="data",
+            help="Tick file or directory of tick files. Default is data.",
+        )
+        backtest_command.add_argument(
+            "--symbol", help="Symbol to replay. Default is the configured symbol."
+        )
+        backtest_command.add_argument(
+            "--speed",
+            type=float,
+            default=0,
+            help="Replay at speed times the recorded pace. Default 0 is as fast as possible.",
+        )
+        backtest_command.set_defaults(func=backtest)
+
         config_command = subparsers.add_parser(
             "create-config",
             help="Create a new config. Default name is set to config.json",
@@ -1,28 +1,50 @@
-import os
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
 
-from rich.console import Console
 from rich.layout import Layout
+from rich.live import Live
 from rich.markdown import Markdown
 from rich.panel import Panel
 from rich.status import Status
+from rich.text import Text
 
 from ceres import __version__
 
 
-class ConsolePanel(Console):
-    def __init__(self, *args, **kwargs):
-        console_file = open(os.devnull, "w")
-        super().__init__(record=True, file=console_file, *args, **kwargs)
+class LogPanel(logging.Handler):
+    """
+    Logging handler keeping the last records in a ring buffer. Records are
+    only formatted when the panel is rendered.
+    """
+
+    def __init__(self, maxlen: int = 200) -> None:
+        super().__init__()
+        self.records: deque = deque(maxlen=maxlen)
+        self.setFormatter(logging.Formatter("%(asctime)s - %(message)s", "%X"))
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
 
     def __rich_console__(self, console, options):
-        texts = self.export_text(clear=False).split("\n")
-        for line in texts[-options.height :]:
-            yield line
+        height = options.height or len(self.records)
+        for record in list(self.records)[-height:]:
+            yield Text(self.format(record), no_wrap=True, overflow="ellipsis")
 
 
 class Dashboard:
-    def __init__(self) -> None:
-        self.console: list[ConsolePanel] = [ConsolePanel() for _ in range(3)]
+    """
+    update only stores the latest data of a panel. Panels are built from
+    this snapshot by the refresh thread of rich Live at its own rate.
+    """
+
+    def __init__(self, refresh_per_second: float = 1, log_lines: int = 200) -> None:
+        self.refresh_per_second = refresh_per_second
+        self.log_panel = LogPanel(log_lines)
+        self._snapshot = {}
+        self._rendered = {}
+        self._lock = threading.Lock()
         self.layout = self.get_renderable()
 
     @property
@@ -32,7 +54,7 @@ class Dashboard:
     def get_renderable(self):
         layout = Layout(name="root")
         layout.split(
-            Layout(self.console[0], name="title", ratio=1),
+            Layout(name="title", ratio=1),
             Layout(name="main", ratio=12),
         )
         layout["title"].update(
@@ -41,8 +63,8 @@ class Dashboard:
             )
         )
         layout["main"].split_row(
-            Layout(self.console[1], name="left"),
-            Layout(self.console[2], name="right"),
+            Layout(name="left"),
+            Layout(name="right"),
         )
         layout["left"].split(Layout(name="profit"), Layout(name="orderbook"))
         layout["profit"].update(
@@ -61,12 +83,62 @@ class Dashboard:
         )
         layout["right"].update(
             Panel(
-                Status("Loading...", spinner="line"),
+                self.log_panel,
                 title="Logs",
                 border_style="green",
             )
         )
         return layout
 
-    def update(self, name, message, title="Info", border_style="green"):
-        self.layout[name].update(Panel(message, title=title, border_style=border_style))
+    def update(self, name, message, title="Info", border_style="green", render=None):
+        """
+        Store the latest data of a panel
+        :param message: renderable or data passed to render
+        :param render: optional function building the renderable from message
+        """
+        with self._lock:
+            self._snapshot[name] = (message, render, title, border_style)
+
+    def render(self):
+        """
+        Apply changed panels of the snapshot to the layout, called by rich Live
+        """
+        with self._lock:
+            snapshot = dict(self._snapshot)
+        for name, entry in snapshot.items():
+            if self._rendered.get(name) is entry:
+                continue
+            message, render, title, border_style = entry
+            renderable = render(message) if render else message
+            self.layout[name].update(
+                Panel(renderable, title=title, border_style=border_style)
+            )
+            self._rendered[name] = entry
+        return self.layout
+
+    @contextmanager
+    def live(self):
+        logger = logging.getLogger("ceres")
+        logger.addHandler(self.log_panel)
+        try:
+            with Live(
+                get_renderable=self.render,
+                refresh_per_second=self.refresh_per_second,
+                screen=True,
+            ):
+                yield self
+        finally:
+            logger.removeHandler(self.log_panel)
+
+
+class HeadlessDashboard:
+    """
+    Dashboard that drops every update, used with --headless
+    """
+
+    def update(self, name, message, title="Info", border_style="green", render=None):
+        pass
+
+    @contextmanager
+    def live(self):
+        yield self
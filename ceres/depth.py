@@ -0,0 +1,124 @@
+import math
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+
+class Execution(NamedTuple):
+    amount: float = 0.0
+    buy_vwap: float = 0.0
+    sell_vwap: float = 0.0
+    buy_price: float = 0.0
+    sell_price: float = 0.0
+    buy_fee: float = 0.0
+    sell_fee: float = 0.0
+    profit: float = 0.0
+
+
+def levels(side) -> np.ndarray:
+    """
+    Price and amount columns of an order book side as float array
+    :param side: list of [price, amount, ...] levels or array
+    """
+    arr = np.asarray(side, dtype=float)
+    if arr.size == 0:
+        return np.empty((0, 2))
+    return arr[:, :2]
+
+
+def buy_cost(amount: float, price: float, fee: float) -> float:
+    """
+    Quote currency a buy order can spend, at its limit price plus taker fee
+    """
+    return amount * price * (1 + fee)
+
+
+def affordable_amount(asks: np.ndarray, budget: float) -> float:
+    """
+    Amount that can be bought by walking the asks with the given quote budget
+    """
+    if asks.size == 0 or budget <= 0:
+        return 0.0
+    cost = np.cumsum(asks[:, 0] * asks[:, 1])
+    idx = int(np.searchsorted(cost, budget))
+    if idx >= len(asks):
+        return float(asks[:, 1].sum())
+    filled = asks[:idx, 1].sum()
+    spent = cost[idx - 1] if idx > 0 else 0.0
+    return float(filled + (budget - spent) / asks[idx, 0])
+
+
+def best_execution(
+    asks: np.ndarray,
+    bids: np.ndarray,
+    buy_fee: float,
+    sell_fee: float,
+    max_amount: float = np.inf,
+    amount_step: Optional[float] = None,
+    budget: float = np.inf,
+    price_tick: Optional[float] = None,
+) -> Execution:
+    """
+    Walk asks of the buy exchange and bids of the sell exchange together and
+    find the amount that maximizes profit after taker fees. Asks are sorted
+    ascending and bids descending, so the profit per unit of every step only
+    decreases and the optimum ends with the last profitable step.
+    :param asks: ask levels of the buy exchange, shape (n, 2)
+    :param bids: bid levels of the sell exchange, shape (m, 2)
+    :param max_amount: upper bound for the amount, e.g. from balances
+    :param amount_step: round the amount down to a multiple of it
+    :param budget: quote the buy may spend, at the limit price of the last
+        walked level plus fee
+    :param price_tick: tick the buy limit price is rounded up to
+    :return: Execution, amount is 0 if there is no profitable size
+    """
+    if asks.size == 0 or bids.size == 0 or max_amount <= 0:
+        return Execution()
+    ask_cum = np.cumsum(asks[:, 1])
+    bid_cum = np.cumsum(bids[:, 1])
+    cap = min(ask_cum[-1], bid_cum[-1], max_amount)
+    ends = np.union1d(ask_cum, bid_cum)
+    ends = np.append(ends[ends < cap], cap)
+    starts = np.concatenate(([0.0], ends[:-1]))
+    sizes = ends - starts
+    ask_idx = np.searchsorted(ask_cum, starts, side="right")
+    bid_idx = np.searchsorted(bid_cum, starts, side="right")
+    ask_prices = asks[ask_idx, 0]
+    bid_prices = bids[bid_idx, 0]
+    margin = bid_prices * (1 - sell_fee) - ask_prices * (1 + buy_fee)
+    steps = int(np.argmin(margin > 0)) if (margin <= 0).any() else len(margin)
+    amount = float(ends[steps - 1]) if steps else 0.0
+    if steps and budget < np.inf:
+        # affordable amount at the limit of each step, falls as prices rise
+        limits = ask_prices[:steps]
+        if price_tick:
+            limits = np.ceil(limits / price_tick - 1e-9) * price_tick
+        caps = budget / (limits * (1 + buy_fee))
+        steps = (
+            int(np.argmin(starts[:steps] < caps))
+            if (starts[:steps] >= caps).any()
+            else steps
+        )
+        if steps:
+            amount = min(float(ends[steps - 1]), float(caps[steps - 1]))
+    if steps == 0:
+        return Execution()
+    if amount_step:
+        amount = round(math.floor(amount / amount_step + 1e-9) * amount_step, 12)
+        if amount <= 0:
+            return Execution()
+        steps = int(np.searchsorted(ends[:steps], amount)) + 1
+    sizes = sizes[:steps].copy()
+    sizes[-1] -= ends[steps - 1] - amount
+    buy_cost = float(ask_prices[:steps] @ sizes)
+    sell_cost = float(bid_prices[:steps] @ sizes)
+    return Execution(
+        amount=amount,
+        buy_vwap=buy_cost / amount,
+        sell_vwap=sell_cost / amount,
+        buy_price=float(ask_prices[steps - 1]),
+        sell_price=float(bid_prices[steps - 1]),
+        buy_fee=buy_cost * buy_fee,
+        sell_fee=sell_cost * sell_fee,
+        profit=float(margin[:steps] @ sizes),
+    )
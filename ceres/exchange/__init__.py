@@ -1,3 +1,11 @@
 from ceres.exchange.exchange import Exchange
 from ceres.exchange.exchangeshandler import ExchangesHandler
-from ceres.exchange.exchangehelpers import retrier
+from ceres.exchange.exchangehelpers import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    retrier,
+)
+from ceres.exchange.markettable import MarketRules, MarketTable
+from ceres.exchange.orderbookengine import OrderBookEngine, QuoteStore
+from ceres.exchange.simulator import FillSimulator
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+import ssl
+from typing import Optional
+
+import aiohttp
+import certifi
+
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """
+    One aiohttp session shared by the REST and websocket connections of all
+    exchange clients. Its connector keeps idle connections alive for
+    keepalive_timeout seconds and caches DNS lookups, so orders go out on
+    warm connections. Open websockets hold a connection of the connector, so
+    connections per host are not limited by default. ccxt does not close
+    sessions it did not create, the pool is closed after the clients.
+    """
+
+    def __init__(self, config) -> None:
+        pool_config = config.get("connections", {})
+        self.shared: bool = pool_config.get("shared", True)
+        self.limit: int = pool_config.get("limit", 100)
+        self.limit_per_host: int = pool_config.get("limit_per_host", 0)
+        self.keepalive_timeout: float = pool_config.get("keepalive_timeout", 60)
+        self.dns_cache_ttl: int = pool_config.get("dns_cache_ttl", 300)
+        self.close_timeout: float = pool_config.get("close_timeout", 5)
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def open(self) -> Optional[aiohttp.ClientSession]:
+        """
+        Create the shared session, must run on the loop of the clients
+        :return: the session or None if sharing is disabled
+        """
+        if self.shared and self.session is None:
+            connector = aiohttp.TCPConnector(
+                ssl=ssl.create_default_context(cafile=certifi.where()),
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+                enable_cleanup_closed=True,
+            )
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    async def close(self) -> None:
+        if self.session is None:
+            return
+        session, self.session = self.session, None
+        try:
+            await asyncio.wait_for(session.close(), self.close_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Closing the shared http session timed out")
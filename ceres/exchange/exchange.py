@@ -10,19 +10,26 @@ from ccxt import (
     InvalidOrder,
     NetworkError,
 )
-from ceres.exchange.exchangehelpers import retrier
+from ccxt.base.decimal_to_precision import DECIMAL_PLACES, TICK_SIZE
+from ceres.exchange.exchangehelpers import CircuitBreaker, RetryPolicy, retrier
 
 logger = logging.getLogger(__name__)
 
 
 class Exchange:
-    def __init__(self, config, ex_dict={}) -> None:
+    def __init__(self, config, ex_dict={}, session=None) -> None:
         self._config = config
         self.dry = self._config.get("dry", True)
         self.ex_dict = ex_dict
-        self.api = self.init_exchange(self.ex_dict)
+        self.api = self.init_exchange(self.ex_dict, session)
+        self.retry_policy = RetryPolicy.from_config(self._config)
+        self.breaker = CircuitBreaker(self.name, self.retry_policy)
+        self.simulator = None
 
-    def init_exchange(self, ex_dict):
+    def init_exchange(self, ex_dict, session=None):
+        """
+        :param session: aiohttp session to use instead of one of its own
+        """
         name = ex_dict.get("name")
 
         ex_config = {
@@ -30,6 +37,8 @@ class Exchange:
             "secret": ex_dict.get("secret"),
             "password": ex_dict.get("password"),
         }
+        if session is not None:
+            ex_config["session"] = session
         try:
             api = getattr(ccxt, name.lower())(ex_config)
         except BaseError as e:
@@ -41,6 +50,12 @@ class Exchange:
     def name(self):
         return self.api.id
 
+    async def close(self):
+        """
+        Close the websocket connections and the session if it is not shared
+        """
+        await self.api.close()
+
     def __str__(self) -> str:
         return self.api.name
 
@@ -60,10 +75,34 @@ class Exchange:
         except BaseError as e:
             raise Exception(e) from e
 
+    @property
+    def streams_order_books(self) -> bool:
+        """
+        One subscription can carry the order books of many symbols
+        """
+        return self.api.has.get("watchOrderBookForSymbols") is True
+
+    @retrier
+    async def watch_order_book_for_symbols(self, symbols):
+        """
+        Next update of any of the symbols, the updated symbol is in ob["symbol"]
+        """
+        try:
+            return await self.api.watch_order_book_for_symbols(symbols)
+        except DDoSProtection as e:
+            raise Exception(e) from e
+        except (NetworkError, ExchangeError) as e:
+            raise Exception(
+                f"Could not get orderbook data due to {e.__class__.__name__}. Message: {e}"
+            ) from e
+        except BaseError as e:
+            raise Exception(e) from e
+
     @retrier
     async def watch_ticker(self, symbol):
-        # watch tickers not working fetch ticker for now
         try:
+            if self.api.has.get("watchTicker") is True:
+                return await self.api.watch_ticker(symbol)
             return await self.api.fetch_ticker(symbol)
         except DDoSProtection as e:
             raise Exception(e) from e
@@ -77,16 +116,26 @@ class Exchange:
     async def load_markets(self, reload=False):
         return await self.api.load_markets(reload=reload)
 
+    def set_markets(self, markets, currencies=None):
+        return self.api.set_markets(markets, currencies)
+
+    @staticmethod
+    def _per_currency(balance):
+        """
+        Keep only the per currency entries of a ccxt balance
+        """
+        for key in ("info", "free", "total", "used", "timestamp", "datetime"):
+            balance.pop(key, None)
+        return balance
+
+    @property
+    def streams_balance(self) -> bool:
+        return self.api.has.get("watchBalance") is True
+
     @retrier
-    async def watch_balance(self):
+    async def fetch_balance(self):
         try:
-            balance = await self.api.fetch_balance()
-            balance.pop("info")
-            balance.pop("free", None)
-            balance.pop("total", None)
-            balance.pop("used", None)
-            return balance
-
+            return self._per_currency(await self.api.fetch_balance())
         except DDoSProtection as e:
             raise Exception(e) from e
         except (NetworkError, ExchangeError) as e:
@@ -96,6 +145,22 @@ class Exchange:
         except BaseError as e:
             raise Exception(e) from e
 
+    @retrier
+    async def watch_balance(self):
+        """
+        Next balance update from the websocket stream
+        """
+        try:
+            return self._per_currency(dict(await self.api.watch_balance()))
+        except DDoSProtection as e:
+            raise Exception(e) from e
+        except (NetworkError, ExchangeError) as e:
+            raise Exception(
+                f"Could not watch balance due to {e.__class__.__name__}. Message: {e}"
+            ) from e
+        except BaseError as e:
+            raise Exception(e) from e
+
     def create_simulated_order(self, symbol, type, side, amount, price, params):
         # assuming all trades immediately filled
         # still need to consider fees
@@ -126,6 +191,10 @@ class Exchange:
 
     async def create_order(self, *, symbol, type, side, amount, price, params):
         if self.dry:
+            if self.simulator:
+                return await self.simulator.create_order(
+                    self.ex_dict.get("name"), symbol, type, side, amount, price, params
+                )
             order = self.create_simulated_order(
                 symbol, type, side, amount, price, params
             )
@@ -138,24 +207,72 @@ class Exchange:
             return order
         except InsufficientFunds as e:
             logger.warning(
-                f"Insufficient funds to create {type} {side} order on market {symbol}. "
-                f"Tried to {side} amount {amount} at rate {price}."
-                f"Message: {e}"
+                "Insufficient funds to create %s %s order on market %s. "
+                "Tried to %s amount %s at rate %s. Message: %s",
+                type,
+                side,
+                symbol,
+                side,
+                amount,
+                price,
+                e,
             )
         except InvalidOrder as e:
             logger.warning(
-                f"Could not create {type} {side} order on market {symbol}. "
-                f"Tried to {side} amount {amount} at rate {price}. "
-                f"Message: {e}"
+                "Could not create %s %s order on market %s. "
+                "Tried to %s amount %s at rate %s. Message: %s",
+                type,
+                side,
+                symbol,
+                side,
+                amount,
+                price,
+                e,
             )
         except DDoSProtection as e:
-            logger.warning(e)
+            logger.warning("%s", e)
         except (NetworkError, ExchangeError) as e:
             logger.warning(
-                f"Could not place {side} order due to {e.__class__.__name__}. Message: {e}"
+                "Could not place %s order due to %s. Message: %s",
+                side,
+                e.__class__.__name__,
+                e,
             )
         except BaseError as e:
-            logger.warning(e)
+            logger.warning("%s", e)
+
+    async def cancel_order(self, id, symbol):
+        if self.dry:
+            return None
+        try:
+            return await self.api.cancel_order(id, symbol)
+        except InvalidOrder as e:
+            logger.warning(
+                "Could not cancel order %s on market %s. Message: %s", id, symbol, e
+            )
+        except DDoSProtection as e:
+            logger.warning("%s", e)
+        except (NetworkError, ExchangeError) as e:
+            logger.warning(
+                "Could not cancel order due to %s. Message: %s", e.__class__.__name__, e
+            )
+        except BaseError as e:
+            logger.warning("%s", e)
+
+    def tick_sizes(self, symbol):
+        """
+        Price tick and amount step of a loaded market as floats
+        :return: (price_tick, amount_step), None if the precision mode is not supported
+        """
+        precision = self.api.markets[symbol].get("precision", {})
+        price, amount = precision.get("price"), precision.get("amount")
+        if price is None or amount is None:
+            return None, None
+        if self.api.precisionMode == TICK_SIZE:
+            return float(price), float(amount)
+        if self.api.precisionMode == DECIMAL_PLACES:
+            return 10.0**-price, 10.0**-amount
+        return None, None
 
     def check_exchange_has(self, method=str) -> bool:
         if self.api.has.get(method, False):
@@ -1,29 +1,221 @@
 import asyncio
+import functools
 import logging
+import random
+import time
+from typing import Dict, NamedTuple
+
+from ccxt import (
+    AuthenticationError,
+    BadRequest,
+    BadSymbol,
+    DDoSProtection,
+    ExchangeError,
+    InsufficientFunds,
+    InvalidOrder,
+    NetworkError,
+    NotSupported,
+    PermissionDenied,
+)
 
 
 logger = logging.getLogger(__name__)
 
+# errors retrying will not fix
+NON_RETRYABLE = (
+    AuthenticationError,
+    BadRequest,
+    BadSymbol,
+    InsufficientFunds,
+    InvalidOrder,
+    NotSupported,
+    PermissionDenied,
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an exchange whose circuit breaker is open"""
+
+
+def classify_error(e: BaseException) -> str:
+    """
+    Classify an exception by the first ccxt error in its cause chain
+    :return: one of ddos, network, fatal, exchange, circuit_open, other
+    """
+    if isinstance(e, CircuitOpenError):
+        return "circuit_open"
+    err = e
+    while err is not None:
+        # DDoSProtection is a NetworkError, so it is checked first
+        if isinstance(err, DDoSProtection):
+            return "ddos"
+        if isinstance(err, NetworkError):
+            return "network"
+        if isinstance(err, NON_RETRYABLE):
+            return "fatal"
+        if isinstance(err, ExchangeError):
+            return "exchange"
+        err = err.__cause__
+    return "other"
+
+
+class RetryPolicy(NamedTuple):
+    max_retries: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 10.0
+    ddos_multiplier: float = 4.0
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+
+    @classmethod
+    def from_config(cls, config) -> "RetryPolicy":
+        return cls(**config.get("retry", {}))
+
+    def backoff(self, attempt: int, error_class: str) -> float:
+        """
+        Exponential backoff with full jitter, longer for rate limit errors
+        """
+        delay = self.base_delay * 2**attempt
+        if error_class == "ddos":
+            delay *= self.ddos_multiplier
+        return random.uniform(0, min(self.max_delay, delay))
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of one exchange. After failure_threshold failures in a
+    row the circuit opens and calls fail fast. After reset_timeout one trial
+    call is let through (half open) while the others are still rejected,
+    success closes the circuit again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, policy: RetryPolicy) -> None:
+        self.name = name
+        self.policy = policy
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self.metrics: Dict[str, int] = {
+            "calls": 0,
+            "failures": 0,
+            "retries": 0,
+            "rejected": 0,
+            "opened": 0,
+        }
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == self.OPEN and self.retry_after() > 0
+
+    def retry_after(self) -> float:
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.policy.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN:
+            if self.retry_after() > 0:
+                self.metrics["rejected"] += 1
+                return False
+            self.state = self.HALF_OPEN
+            logger.info(f"Circuit for {self.name} half open, trying again")
+        if self.state == self.HALF_OPEN:
+            if self._trial_in_flight:
+                self.metrics["rejected"] += 1
+                return False
+            self._trial_in_flight = True
+        return True
+
+    def record_cancelled(self) -> None:
+        """
+        A cancelled call neither closes nor opens the circuit, the next call
+        can be the trial
+        """
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        self.metrics["calls"] += 1
+        self._trial_in_flight = False
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit for {self.name} closed")
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self, error_class: str) -> None:
+        self.metrics["calls"] += 1
+        self.metrics["failures"] += 1
+        self.metrics[error_class] = self.metrics.get(error_class, 0) + 1
+        self._trial_in_flight = False
+        if error_class == "fatal":
+            # a rejected request says nothing about the health of the exchange
+            return
+        self.failures += 1
+        if (
+            self.state == self.HALF_OPEN
+            or self.failures >= self.policy.failure_threshold
+        ):
+            if self.state != self.OPEN:
+                self.metrics["opened"] += 1
+                logger.warning(
+                    f"Circuit for {self.name} open for {self.policy.reset_timeout}s after {self.failures} failures"
+                )
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+DEFAULT_POLICY = RetryPolicy()
+
 
 def retrier(f):
+    """
+    Retry an async exchange method with jittered backoff. Uses retry_policy
+    and breaker of the Exchange instance if present.
+    """
+
+    @functools.wraps(f)
     async def wrapper(*args, **kwargs):
-        count = kwargs.pop("count", 4)
-        try:
-            return await f(*args, **kwargs)
-        except Exception as e:
-            msg = f'{f.__name__}() returned exception: "{e}". '
-            if count > 0:
-                msg += f"Retrying still for {count} times."
-                count -= 1
-                kwargs["count"] = count
-                backoff_delay = (4 - (count + 1)) ** 2 + 1
-                logger.info(f"Applying DDosProtection backoff delay: {backoff_delay}")
-                await asyncio.sleep(backoff_delay)
-                if msg:
-                    logger.warning(msg)
-                return await wrapper(*args, **kwargs)
-            else:
-                logger.warning(msg + "Giving up.")
-                raise e
+        owner = args[0] if args else None
+        policy = getattr(owner, "retry_policy", DEFAULT_POLICY)
+        breaker = getattr(owner, "breaker", None)
+        count = kwargs.pop("count", policy.max_retries)
+        attempt = 0
+        while True:
+            if breaker and not breaker.allow():
+                raise CircuitOpenError(
+                    f"{f.__name__}() skipped, circuit for {breaker.name} is {breaker.state}"
+                )
+            try:
+                result = await f(*args, **kwargs)
+            except asyncio.CancelledError:
+                if breaker:
+                    breaker.record_cancelled()
+                raise
+            except Exception as e:
+                error_class = classify_error(e)
+                if breaker:
+                    breaker.record_failure(error_class)
+                msg = f'{f.__name__}() returned {error_class} exception: "{e}". '
+                if (
+                    error_class == "fatal"
+                    or attempt >= count
+                    or (breaker and breaker.is_open)
+                ):
+                    logger.warning(msg + "Giving up.")
+                    raise
+                delay = policy.backoff(attempt, error_class)
+                attempt += 1
+                if breaker:
+                    breaker.metrics["retries"] += 1
+                logger.warning(msg + f"Retry {attempt} of {count} in {delay:.2f}s.")
+                await asyncio.sleep(delay)
+                continue
+            if breaker:
+                breaker.record_success()
+            return result
 
     return wrapper
@@ -2,6 +2,8 @@ import logging
 import asyncio
 
 from ceres.exchange import Exchange
+from ceres.exchange.connections import ConnectionPool
+from ceres.exchange.marketcache import MarketCache
 
 logger = logging.getLogger(__name__)
 
@@ -13,32 +15,98 @@ class ExchangesHandler:
         self.exchanges_list = []
         self.exchanges = {}
         self.markets = {}
+        self.market_cache = MarketCache(self._config)
+        self._markets_listeners = []
+        self._revalidation = None
         self.loop = asyncio.new_event_loop()
         asyncio.set_event_loop(self.loop)
+        self.connections = ConnectionPool(self._config)
         self._get_exchanges()
         self.markets = self._load_markets()
         self._check_symbol_on_exchange()
 
     def _get_exchanges(self):
+        session = self.loop.run_until_complete(self.connections.open())
         ex_info = self._config.get("exchanges")
         for ex in ex_info:
             name = ex.get("name")
-            self.exchanges[name] = Exchange(self._config, ex)
+            self.exchanges[name] = Exchange(self._config, ex, session)
         self.exchanges_list = list(self.exchanges.keys())
 
     def __del__(self):
         """Destructor - clean up async"""
-        self.close()
+        try:
+            self.close()
+        except Exception:
+            pass
 
     def close(self):
-        logger.info("ExchangesHandler object destroyed, closing async loop")
-        if self.loop and not self.loop.is_closed():
+        """
+        Cancel the tasks left on the loop, close the exchange clients, then the
+        shared session and finally the loop
+        """
+        if not self.loop or self.loop.is_closed():
+            return
+        logger.info("Closing exchange connections and async loop")
+        try:
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                self.loop.run_until_complete(
+                    asyncio.gather(*tasks, return_exceptions=True)
+                )
+            self.loop.run_until_complete(self.aclose())
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+        finally:
             self.loop.close()
 
+    async def aclose(self):
+        """
+        Close the exchange clients and the shared session
+        """
+        results = await asyncio.gather(
+            *(
+                asyncio.wait_for(
+                    self.exchanges[ex].close(), self.connections.close_timeout
+                )
+                for ex in self.exchanges_list
+            ),
+            return_exceptions=True,
+        )
+        for ex, result in zip(self.exchanges_list, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"Closing {ex} failed. Message: {result!r}")
+        await self.connections.close()
+
     @property
     def current_exchanges(self):
         return self.exchanges_list
 
+    def available_exchanges(self):
+        """
+        Exchanges whose circuit breaker is not open
+        """
+        return [
+            ex for ex in self.exchanges_list if not self.exchanges[ex].breaker.is_open
+        ]
+
+    def retry_metrics(self):
+        return {
+            ex: {
+                "state": self.exchanges[ex].breaker.state,
+                **self.exchanges[ex].breaker.metrics,
+            }
+            for ex in self.exchanges_list
+        }
+
+    def set_simulator(self, simulator):
+        """
+        Fill dry orders of all exchanges with the given FillSimulator
+        """
+        for ex in self.exchanges_list:
+            self.exchanges[ex].simulator = simulator
+
     def get_markets(self):
         if not self.markets:
             self.markets = self._load_markets()
@@ -66,16 +134,17 @@ class ExchangesHandler:
             )
         )
 
-    def get_balances(self, params=None):
+    async def fetch_balances(self, params=None):
         return dict(
             zip(
                 self.exchanges_list,
-                self.loop.run_until_complete(
-                    self._gather_tasks(operation="watch_balance", params=params)
-                ),
+                await self._gather_tasks(operation="fetch_balance", params=params),
             )
         )
 
+    def get_balances(self, params=None):
+        return self.loop.run_until_complete(self.fetch_balances(params=params))
+
     def get_ticker_on_exchanges(self, params=None):
         return dict(
             zip(
@@ -86,16 +155,65 @@ class ExchangesHandler:
             )
         )
 
+    def add_markets_listener(self, callback):
+        """
+        Register a callback called after markets were reloaded in the background
+        """
+        self._markets_listeners.append(callback)
+
     def _load_markets(self):
-        logger.info(f"Loading markets for exchanges {*self.exchanges_list,}")
-        return dict(
-            zip(
-                self.exchanges_list,
-                self.loop.run_until_complete(
-                    self._gather_tasks(operation="load_markets")
-                ),
-            )
+        """
+        Use cached markets where available. Missing exchanges are loaded now,
+        exchanges with expired cache are reloaded once the loop runs.
+        """
+        markets = {}
+        missing = []
+        stale = []
+        for ex in self.exchanges_list:
+            entry = self.market_cache.get(ex)
+            if entry is None:
+                missing.append(ex)
+                continue
+            self.exchanges[ex].set_markets(entry["markets"], entry["currencies"])
+            markets[ex] = entry["markets"]
+            if not self.market_cache.is_fresh(ex):
+                stale.append(ex)
+        if missing:
+            logger.info(f"Loading markets for exchanges {*missing,}")
+            markets.update(self.loop.run_until_complete(self._fetch_markets(missing)))
+        if stale:
+            logger.info(f"Using cached markets, reloading {*stale,} in background")
+            self._revalidation = self.loop.create_task(self._revalidate_markets(stale))
+        return {ex: markets[ex] for ex in self.exchanges_list}
+
+    def wait_for_markets(self):
+        """
+        Finish reloading expired cached markets now instead of in the background
+        """
+        if self._revalidation and not self._revalidation.done():
+            self.loop.run_until_complete(self._revalidation)
+
+    async def _fetch_markets(self, exchanges, reload=False):
+        markets = await asyncio.gather(
+            *(self.exchanges[ex].load_markets(reload=reload) for ex in exchanges)
         )
+        for ex in exchanges:
+            self.market_cache.set(
+                ex, self.exchanges[ex].api.markets, self.exchanges[ex].api.currencies
+            )
+        self.market_cache.save()
+        return dict(zip(exchanges, markets))
+
+    async def _revalidate_markets(self, exchanges):
+        try:
+            markets = await self._fetch_markets(exchanges, reload=True)
+        except Exception as e:
+            logger.warning(f"Reloading markets for {*exchanges,} failed. Message: {e}")
+            return
+        self.markets.update(markets)
+        for callback in self._markets_listeners:
+            callback()
+        logger.info(f"Reloaded markets for exchanges {*exchanges,}")
 
     def _check_symbol_on_exchange(self):
         for ex, market in self.markets.items():
@@ -0,0 +1,69 @@
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class MarketCache:
+    """
+    Stores the loaded markets and currencies of every exchange in a local json
+    file, so a restart can use them without calling load_markets
+    """
+
+    def __init__(self, config) -> None:
+        cache_config = config.get("market_cache", {})
+        self.enabled: bool = cache_config.get("enabled", True)
+        self.path = Path(cache_config.get("path", "markets_cache.json"))
+        self.ttl: float = cache_config.get("ttl", 3600)
+        self._data: Dict[str, Dict[str, Any]] = self._read() if self.enabled else {}
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        if not self.path.is_file():
+            return {}
+        try:
+            with self.path.open() as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read market cache {self.path}. Message: {e}")
+            return {}
+
+    def get(self, exchange: str) -> Optional[Dict[str, Any]]:
+        return self._data.get(exchange)
+
+    def is_fresh(self, exchange: str) -> bool:
+        entry = self.get(exchange)
+        return entry is not None and time.time() - entry["timestamp"] < self.ttl
+
+    def set(self, exchange: str, markets, currencies) -> None:
+        self._data[exchange] = {
+            "timestamp": time.time(),
+            "markets": markets,
+            "currencies": currencies,
+        }
+
+    def save(self) -> None:
+        if not self.enabled:
+            return
+        # a temporary file per writer, several processes may save at once
+        tmp = None
+        try:
+            with tempfile.NamedTemporaryFile(
+                mode="w",
+                dir=self.path.parent,
+                prefix=self.path.name,
+                suffix=".tmp",
+                delete=False,
+            ) as file:
+                tmp = file.name
+                json.dump(self._data, file)
+            os.replace(tmp, self.path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not write market cache {self.path}. Message: {e}")
+            if tmp and os.path.exists(tmp):
+                os.remove(tmp)
@@ -0,0 +1,152 @@
+import logging
+import math
+from fractions import Fraction
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+# tolerance for float noise before flooring or ceiling to a step, 1000.9999999999
+# ticks of a price that is on the grid must count as 1001
+EPSILON = 1e-9
+
+
+class MarketRules(NamedTuple):
+    price_tick: Optional[float] = None
+    amount_step: Optional[float] = None
+    min_amount: float = 0.0
+    max_amount: float = math.inf
+    min_cost: float = 0.0
+    max_cost: float = math.inf
+    min_price: float = 0.0
+    max_price: float = math.inf
+
+
+NO_RULES = MarketRules()
+
+
+def _limit(limits, key, bound, default) -> float:
+    value = (limits.get(key) or {}).get(bound)
+    return default if value is None else float(value)
+
+
+def _floor(value: float, step: Optional[float]) -> float:
+    if not step:
+        return value
+    return round(math.floor(value / step + EPSILON) * step, 12)
+
+
+def _ceil(value: float, step: Optional[float]) -> float:
+    if not step:
+        return value
+    return round(math.ceil(value / step - EPSILON) * step, 12)
+
+
+def _lcm(steps: List[float]) -> Optional[float]:
+    """
+    Least common multiple of decimal steps, exact on their decimal representation
+    """
+    if not steps:
+        return None
+    fractions = [Fraction(str(step)) for step in steps]
+    numerator = math.lcm(*(f.numerator for f in fractions))
+    denominator = math.gcd(*(f.denominator for f in fractions))
+    return float(Fraction(numerator, denominator))
+
+
+class MarketTable:
+    """
+    Precision and limits of the given symbols on every exchange, built once
+    from the loaded markets, so orders are rounded and checked locally
+    instead of being rejected by the exchange after a round trip. Markets
+    without precision are not rounded, missing limits do not restrict.
+    """
+
+    def __init__(self, exchangeshandler, symbols: List[str]) -> None:
+        self.exchangeshandler = exchangeshandler
+        self.symbols = symbols
+        self._rules: Dict[Tuple[str, str], MarketRules] = {}
+        self._common_steps: Dict[Tuple[Tuple[str, ...], str], Optional[float]] = {}
+        self.build()
+
+    def build(self) -> None:
+        rules = {}
+        markets = self.exchangeshandler.get_markets()
+        for ex, market in markets.items():
+            exchange = self.exchangeshandler.exchanges.get(ex)
+            for symbol in self.symbols:
+                m = market.get(symbol)
+                if m is None:
+                    continue
+                price_tick, amount_step = (
+                    exchange.tick_sizes(symbol) if exchange else (None, None)
+                )
+                limits = m.get("limits") or {}
+                rules[(ex, symbol)] = MarketRules(
+                    price_tick=price_tick,
+                    amount_step=amount_step,
+                    min_amount=_limit(limits, "amount", "min", 0.0),
+                    max_amount=_limit(limits, "amount", "max", math.inf),
+                    min_cost=_limit(limits, "cost", "min", 0.0),
+                    max_cost=_limit(limits, "cost", "max", math.inf),
+                    min_price=_limit(limits, "price", "min", 0.0),
+                    max_price=_limit(limits, "price", "max", math.inf),
+                )
+        self._rules = rules
+        self._common_steps = {}
+        logger.info(f"Market rules: {self._rules}")
+
+    def get(self, exchange: str, symbol: str) -> MarketRules:
+        return self._rules.get((exchange, symbol), NO_RULES)
+
+    def round_amount(self, exchange: str, symbol: str, amount: float) -> float:
+        """
+        Round down to the amount step, never more than was asked for
+        """
+        return _floor(amount, self.get(exchange, symbol).amount_step)
+
+    def round_price(self, exchange: str, symbol: str, side: str, price: float):
+        """
+        Round to the price tick towards the other side of the book, buys up
+        and sells down, so the limit still reaches the walked levels
+        """
+        tick = self.get(exchange, symbol).price_tick
+        return _ceil(price, tick) if side == "buy" else _floor(price, tick)
+
+    def common_step(self, exchanges: List[str], symbol: str) -> Optional[float]:
+        """
+        Smallest amount step that is a multiple of the steps of all exchanges
+        """
+        key = (tuple(exchanges), symbol)
+        if key not in self._common_steps:
+            steps = [self.get(ex, symbol).amount_step for ex in exchanges]
+            self._common_steps[key] = _lcm([step for step in steps if step])
+        return self._common_steps[key]
+
+    def validate(
+        self, exchange: str, symbol: str, amount: float, price: float
+    ) -> Optional[str]:
+        """
+        :return: reason the exchange would reject the order, None if valid
+        """
+        rules = self.get(exchange, symbol)
+        if amount <= 0:
+            return "amount is zero"
+        if amount < rules.min_amount * (1 - EPSILON):
+            return f"amount {amount} below minimum {rules.min_amount}"
+        if amount > rules.max_amount * (1 + EPSILON):
+            return f"amount {amount} above maximum {rules.max_amount}"
+        if rules.amount_step:
+            steps = amount / rules.amount_step
+            if abs(steps - round(steps)) > EPSILON * max(1.0, steps):
+                return f"amount {amount} not a multiple of step {rules.amount_step}"
+        if price < rules.min_price * (1 - EPSILON):
+            return f"price {price} below minimum {rules.min_price}"
+        if price > rules.max_price * (1 + EPSILON):
+            return f"price {price} above maximum {rules.max_price}"
+        cost = amount * price
+        if cost < rules.min_cost * (1 - EPSILON):
+            return f"cost {cost} below minimum {rules.min_cost}"
+        if cost > rules.max_cost * (1 + EPSILON):
+            return f"cost {cost} above maximum {rules.max_cost}"
+        return None
@@ -0,0 +1,320 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from ceres.exchange.exchangehelpers import CircuitOpenError, classify_error
+from ceres.orderbook import OrderBook
+from ceres.recorder import Recorder
+
+logger = logging.getLogger(__name__)
+
+
+class ClockOffset:
+    """
+    Estimates the offset of an exchange clock as the smallest difference of
+    local receive time and exchange timestamp within the last window seconds.
+    That is the clock offset plus the fastest delivery, anything above it is
+    delay of the book. Sliding minimum, O(1) amortized per update.
+    """
+
+    def __init__(self, window: float = 60.0) -> None:
+        self.window = window
+        self._samples: Deque[Tuple[float, float]] = deque()
+
+    def update(self, received: float, difference: float) -> float:
+        """
+        :param received: local receive time in seconds
+        :param difference: receive time minus exchange timestamp in seconds
+        :return: current offset estimate
+        """
+        while self._samples and self._samples[-1][1] >= difference:
+            self._samples.pop()
+        self._samples.append((received, difference))
+        while self._samples[0][0] < received - self.window:
+            self._samples.popleft()
+        return self._samples[0][1]
+
+    @property
+    def offset(self) -> Optional[float]:
+        return self._samples[0][1] if self._samples else None
+
+
+class QuoteStore:
+    """
+    Holds the latest order book per exchange and symbol together with
+    the local time it was received. Every book is copied into a preallocated
+    OrderBook, stored as fixed point if tick_sizes returns the market precision.
+    The age of a book is the time since it was received plus the delay it had
+    on arrival according to its exchange timestamp and the estimated clock
+    offset of the exchange, so books that arrive late or stop arriving both
+    age out. The deadline of every book is computed on update, so checking
+    freshness is constant time.
+    clock returns the current time in seconds, wall_clock the time since
+    epoch to compare with exchange timestamps, replays pass their own.
+    """
+
+    def __init__(
+        self,
+        max_age: float = 5.0,
+        depth: int = 50,
+        tick_sizes: Optional[Callable[[str, str], Tuple[Any, Any]]] = None,
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], float] = time.time,
+        offset_window: float = 60.0,
+    ) -> None:
+        self.max_age = max_age
+        self.depth = depth
+        self.tick_sizes = tick_sizes
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.offset_window = offset_window
+        self._books: Dict[Tuple[str, str], OrderBook] = {}
+        self._received: Dict[Tuple[str, str], float] = {}
+        self._delay: Dict[Tuple[str, str], float] = {}
+        self._deadline: Dict[Tuple[str, str], float] = {}
+        self.offsets: Dict[str, ClockOffset] = {}
+
+    def _new_book(self, exchange: str, symbol: str) -> OrderBook:
+        price_tick, amount_step = (
+            self.tick_sizes(exchange, symbol) if self.tick_sizes else (None, None)
+        )
+        return OrderBook(symbol, self.depth, price_tick, amount_step)
+
+    def _arrival_delay(self, exchange: str, timestamp: Optional[int]) -> float:
+        """
+        Delay of a book beyond the fastest delivery seen recently
+        :param timestamp: exchange timestamp in ms
+        """
+        if not timestamp:
+            return 0.0
+        offset = self.offsets.get(exchange)
+        if offset is None:
+            offset = self.offsets[exchange] = ClockOffset(self.offset_window)
+        wall = self.wall_clock()
+        difference = wall - timestamp / 1000
+        return difference - offset.update(wall, difference)
+
+    def update(self, exchange: str, symbol: str, orderbook) -> None:
+        key = (exchange, symbol)
+        book = self._books.get(key)
+        if book is None:
+            book = self._books[key] = self._new_book(exchange, symbol)
+        book.update(orderbook)
+        received = self.clock()
+        delay = self._arrival_delay(exchange, orderbook.get("timestamp"))
+        self._received[key] = received
+        self._delay[key] = delay
+        self._deadline[key] = received + self.max_age - delay
+
+    def get(self, exchange: str, symbol: str) -> Optional[OrderBook]:
+        return self._books.get((exchange, symbol))
+
+    def received_at(self, exchange: str, symbol: str) -> Optional[float]:
+        """
+        Local clock time the book was received
+        """
+        return self._received.get((exchange, symbol))
+
+    def age(self, exchange: str, symbol: str) -> float:
+        received = self._received.get((exchange, symbol))
+        if received is None:
+            return float("inf")
+        return self.clock() - received + self._delay[(exchange, symbol)]
+
+    def is_fresh(self, exchange: str, symbol: str) -> bool:
+        return self.clock() <= self._deadline.get((exchange, symbol), float("-inf"))
+
+    def fresh_exchanges(self, symbol: str, exchanges: List[str]) -> List[str]:
+        """
+        Exchanges whose book for symbol is not older than max_age
+        """
+        now = self.clock()
+        missing = float("-inf")
+        deadline = self._deadline
+        return [ex for ex in exchanges if now <= deadline.get((ex, symbol), missing)]
+
+    def clock_offsets(self) -> Dict[str, Optional[float]]:
+        return {ex: offset.offset for ex, offset in self.offsets.items()}
+
+
+class OrderBookEngine:
+    """
+    Runs one long-lived order book stream per exchange and symbol and calls
+    on_update as soon as any book changes. Exchanges whose book is older than
+    max_quote_age are left out, updates are skipped until at least quorum
+    exchanges have a fresh book. Exchanges with an open circuit breaker are
+    left out as well.
+    Symbols are either streamed on every exchange (list) or given per exchange
+    (dict of exchange to list). Exchanges with watchOrderBookForSymbols stream
+    up to subscription_batch_size symbols over one subscription, if that is
+    rejected they fall back to one stream per symbol.
+    """
+
+    def __init__(
+        self,
+        config,
+        exchangeshandler,
+        symbols: Union[List[str], Dict[str, List[str]]],
+        on_update: Callable[[str, str, List[str]], Awaitable[None]],
+        quorum: Optional[int] = None,
+        metrics=None,
+    ) -> None:
+        self._config = config
+        self.exchangeshandler = exchangeshandler
+        self.symbols = symbols
+        self.on_update = on_update
+        self.metrics = metrics
+        self.quorum = quorum if quorum is not None else self._config.get("quorum", 2)
+        self.restart_delay = self._config.get("stream_restart_delay", 1)
+        self.batch_size = self._config.get("subscription_batch_size", 50)
+        self.store = QuoteStore(
+            self._config.get("max_quote_age", 5),
+            self._config.get("orderbook_depth", 50),
+            self._tick_sizes if self._config.get("fixed_point_books") else None,
+            offset_window=self._config.get("clock_offset_window", 60),
+        )
+        self.recorder = None
+        if self._config.get("recorder", {}).get("enabled", False):
+            self.recorder = Recorder(self._config)
+        self._tasks: List[asyncio.Task] = []
+
+    def _tick_sizes(self, exchange: str, symbol: str):
+        return self.exchangeshandler.exchanges[exchange].tick_sizes(symbol)
+
+    async def _stream(self, exchange: str, symbol: str) -> None:
+        ex = self.exchangeshandler.exchanges[exchange]
+        while True:
+            try:
+                ob = await ex.watch_order_book(symbol)
+            except asyncio.CancelledError:
+                raise
+            except CircuitOpenError:
+                await asyncio.sleep(max(ex.breaker.retry_after(), self.restart_delay))
+                continue
+            except Exception as e:
+                logger.warning(
+                    f"Order book stream for {symbol} on {exchange} failed, restarting. Message: {e}"
+                )
+                await asyncio.sleep(self.restart_delay)
+                continue
+            await self._handle(exchange, symbol, ob)
+
+    async def _stream_batches(self, exchange: str, symbols: List[str]) -> None:
+        """
+        Stream the symbols in batches. The first batch probes whether the
+        exchange accepts batch subscriptions, the others start after its first
+        update, so a rejection counts once against the circuit breaker.
+        """
+        supported = asyncio.get_running_loop().create_future()
+        await asyncio.gather(
+            *(
+                self._stream_batch(
+                    exchange, symbols[k : k + self.batch_size], supported, k == 0
+                )
+                for k in range(0, len(symbols), self.batch_size)
+            )
+        )
+
+    async def _stream_batch(
+        self, exchange: str, symbols: List[str], supported: asyncio.Future, probe: bool
+    ) -> None:
+        ex = self.exchangeshandler.exchanges[exchange]
+        if not probe and not await asyncio.shield(supported):
+            await asyncio.gather(
+                *(self._stream(exchange, symbol) for symbol in symbols)
+            )
+            return
+        while True:
+            try:
+                ob = await ex.watch_order_book_for_symbols(symbols)
+            except asyncio.CancelledError:
+                raise
+            except CircuitOpenError:
+                await asyncio.sleep(max(ex.breaker.retry_after(), self.restart_delay))
+                continue
+            except Exception as e:
+                if classify_error(e) == "fatal":
+                    logger.warning(
+                        f"Batch order book stream on {exchange} rejected, streaming {len(symbols)} symbols one by one. Message: {e}"
+                    )
+                    if not supported.done():
+                        supported.set_result(False)
+                    await asyncio.gather(
+                        *(self._stream(exchange, symbol) for symbol in symbols)
+                    )
+                    return
+                logger.warning(
+                    f"Batch order book stream on {exchange} failed, restarting. Message: {e}"
+                )
+                await asyncio.sleep(self.restart_delay)
+                continue
+            if not supported.done():
+                supported.set_result(True)
+            await self._handle(exchange, ob["symbol"], ob)
+
+    async def _handle(self, exchange: str, symbol: str, ob) -> None:
+        received = time.time_ns()
+        if not ob["bids"] or not ob["asks"]:
+            return
+        if self.metrics and ob.get("timestamp"):
+            self.metrics.record(
+                "feed", exchange, received / 1e9 - ob["timestamp"] / 1000
+            )
+        self.store.update(exchange, symbol, ob)
+        fresh = self.store.fresh_exchanges(
+            symbol, self.exchangeshandler.available_exchanges()
+        )
+        if len(fresh) >= self.quorum:
+            try:
+                await self.on_update(exchange, symbol, fresh)
+            except Exception:
+                logger.exception(f"Handling order book update from {exchange} failed")
+        # recorded after the strategy has seen the update, the book of this
+        # stream does not change until the next update is handled
+        if self.recorder:
+            self.recorder.record(
+                exchange, symbol, self.store.get(exchange, symbol), received
+            )
+
+    def subscriptions(self) -> Dict[str, List[str]]:
+        if isinstance(self.symbols, dict):
+            return self.symbols
+        return {ex: self.symbols for ex in self.exchangeshandler.current_exchanges}
+
+    def _streams(self, exchange: str, symbols: List[str]) -> List[Awaitable[None]]:
+        ex = self.exchangeshandler.exchanges[exchange]
+        if self.batch_size > 1 and len(symbols) > 1 and ex.streams_order_books:
+            return [self._stream_batches(exchange, symbols)]
+        return [self._stream(exchange, symbol) for symbol in symbols]
+
+    async def run(self) -> None:
+        self._tasks = [
+            asyncio.create_task(stream)
+            for ex, symbols in self.subscriptions().items()
+            for stream in self._streams(ex, symbols)
+        ]
+        logger.info(f"Started {len(self._tasks)} order book streams")
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            await self.stop()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.recorder:
+            self.recorder.close()
@@ -0,0 +1,104 @@
+import asyncio
+import math
+import random
+from datetime import datetime
+from typing import Callable, Tuple
+
+import numpy as np
+
+from ceres.depth import levels as to_levels
+
+
+class FillSimulator:
+    """
+    Fills dry orders against order book depth. Buys walk the asks and sells
+    the bids up to the limit price, taker fees come from the markets. Before
+    matching, every order waits a latency drawn per exchange so the book can
+    move in the meantime.
+    """
+
+    def __init__(self, config, book_source: Callable, markets) -> None:
+        sim_config = config.get("simulator", {})
+        self.latency = sim_config.get("latency", {})
+        self.book_source = book_source
+        self.markets = markets
+        self._random = random.Random(sim_config.get("seed"))
+
+    def sample_latency(self, exchange: str) -> float:
+        """
+        Latency in seconds from a normal distribution with the mean and jitter
+        configured for the exchange or as default
+        """
+        latency = self.latency.get(exchange, self.latency.get("default", {}))
+        mean = latency.get("mean", 0.05)
+        jitter = latency.get("jitter", 0.02)
+        return max(0.0, self._random.gauss(mean, jitter))
+
+    def taker_fee(self, exchange: str, symbol: str) -> float:
+        return self.markets.get(exchange, {}).get(symbol, {}).get("taker", 0.001)
+
+    @staticmethod
+    def match(levels: np.ndarray, side: str, amount: float, price=None) -> Tuple:
+        """
+        Walk the levels of the opposite side, best first
+        :return: filled amount and cost
+        """
+        if levels.size == 0:
+            return 0.0, 0.0
+        prices, sizes = levels[:, 0], levels[:, 1]
+        if price is not None:
+            ok = prices <= price if side == "buy" else prices >= price
+            n = len(ok) if ok.all() else int(np.argmin(ok))
+            prices, sizes = prices[:n], sizes[:n]
+        before = np.cumsum(sizes) - sizes
+        take = np.minimum(sizes, np.maximum(amount - before, 0))
+        return float(take.sum()), float(take @ prices)
+
+    def fill(self, exchange, symbol, type, side, amount, price, params=None):
+        """
+        Match an order against the current book and return it as ccxt order
+        """
+        params = params or {}
+        book = self.book_source(exchange, symbol)
+        filled, cost = 0.0, 0.0
+        if book is not None:
+            levels = to_levels(book["asks" if side == "buy" else "bids"])
+            limit = price if type == "limit" else None
+            filled, cost = self.match(levels, side, amount, limit)
+        time_in_force = params.get("timeInForce", "GTC")
+        if time_in_force == "FOK" and filled < amount:
+            filled, cost = 0.0, 0.0
+        if math.isclose(filled, amount, rel_tol=1e-9):
+            status = "closed"
+        elif type == "market" or time_in_force in ("IOC", "FOK"):
+            status = "canceled"
+        else:
+            status = "open"
+        fee = cost * self.taker_fee(exchange, symbol)
+        now = datetime.utcnow()
+        return {
+            "id": f"dry_order_{now.timestamp()}",
+            "datetime": now.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+            "timestamp": int(now.timestamp() * 1000),
+            "symbol": symbol,
+            "type": type,
+            "timeInForce": time_in_force,
+            "postOnly": False,
+            "side": side,
+            "price": price,
+            "average": cost / filled if filled else None,
+            "amount": amount,
+            "cost": cost,
+            "filled": filled,
+            "remaining": amount - filled,
+            "status": status,
+            "fee": {"cost": fee, "currency": symbol.split("/")[1]},
+            "trades": [],
+            "info": {},
+            "fees": [],
+            "reduceOnly": None,
+        }
+
+    async def create_order(self, exchange, symbol, type, side, amount, price, params):
+        await asyncio.sleep(self.sample_latency(exchange))
+        return self.fill(exchange, symbol, type, side, amount, price, params)
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class LegResult(NamedTuple):
+    exchange: str
+    order: Dict[str, Any]
+    response: Optional[Dict[str, Any]]
+    filled: float
+    latency: float
+    submitted: float
+    corrective: bool = False
+
+
+class OrderExecutor:
+    """
+    Sends both legs of an opportunity at the same time, several
+    opportunities on distinct exchanges are executed together. If one leg
+    fails or fills less than the other, the difference is either unwound on
+    the exchange of the larger leg or hedged on the exchange of the smaller
+    leg with a market order, which is returned as corrective leg.
+    """
+
+    def __init__(self, config, exchangeshandler, market_table=None) -> None:
+        """
+        :param market_table: MarketTable to round and check corrective orders
+        """
+        self._config = config
+        self.exchangeshandler = exchangeshandler
+        self.market_table = market_table
+        self.partial_fill_action = self._config.get("partial_fill_action", "unwind")
+        self.time_in_force = self._config.get("time_in_force", "IOC")
+        self._lock = asyncio.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    async def execute(self, orders) -> List[LegResult]:
+        return (await self.execute_all([orders]))[0]
+
+    async def execute_all(self, opportunities) -> List[List[LegResult]]:
+        """
+        Execute opportunities on distinct exchanges at the same time
+        :return: leg results per opportunity
+        """
+        async with self._lock:
+            return list(
+                await asyncio.gather(
+                    *(self._execute(orders) for orders in opportunities)
+                )
+            )
+
+    async def _execute(self, orders) -> List[LegResult]:
+        legs = list(orders.get("exchange_orders").items())
+        results = await asyncio.gather(*(self._submit(ex, order) for ex, order in legs))
+        for leg in results:
+            logger.info(
+                f"{leg.order['side']} leg on {leg.exchange} filled {leg.filled} of {leg.order['amount']} in {leg.latency * 1000:.1f} ms"
+            )
+        correction = await self._balance_legs(results)
+        if correction:
+            results.append(correction)
+        return results
+
+    async def _submit(self, exchange, order, params=None) -> LegResult:
+        if params is None:
+            params = {"timeInForce": self.time_in_force} if self.time_in_force else {}
+        submitted = time.monotonic()
+        start = time.perf_counter()
+        try:
+            response = await self.exchangeshandler.exchanges[exchange].create_order(
+                symbol=order["symbol"],
+                type=order["type"],
+                side=order["side"],
+                amount=order["amount"],
+                price=order.get("price"),
+                params=params,
+            )
+        except Exception as e:
+            logger.warning(f"{order['side']} order on {exchange} failed. Message: {e}")
+            response = None
+        latency = time.perf_counter() - start
+        if response and response.get("status") == "open":
+            await self._cancel(exchange, response)
+        filled = (response or {}).get("filled") or 0.0
+        return LegResult(exchange, order, response, filled, latency, submitted)
+
+    async def _cancel(self, exchange, response) -> None:
+        try:
+            await self.exchangeshandler.exchanges[exchange].cancel_order(
+                response["id"], response["symbol"]
+            )
+        except Exception as e:
+            logger.warning(
+                f"Could not cancel order {response['id']} on {exchange}. Message: {e}"
+            )
+
+    async def _balance_legs(self, results: List[LegResult]) -> Optional[LegResult]:
+        buy = next(leg for leg in results if leg.order["side"] == "buy")
+        sell = next(leg for leg in results if leg.order["side"] == "sell")
+        imbalance = buy.filled - sell.filled
+        if math.isclose(buy.filled, sell.filled, rel_tol=1e-9, abs_tol=1e-12):
+            return None
+        if self.partial_fill_action == "hedge":
+            # complete the smaller leg
+            leg = sell if imbalance > 0 else buy
+        else:
+            # reverse the excess of the larger leg
+            leg = buy if imbalance > 0 else sell
+        side = "sell" if imbalance > 0 else "buy"
+        symbol = leg.order["symbol"]
+        amount = abs(imbalance)
+        noise = amount * 1e-9
+        tolerance = noise
+        if self.market_table:
+            amount = self.market_table.round_amount(leg.exchange, symbol, amount)
+            step = self.market_table.get(leg.exchange, symbol).amount_step
+            if step:
+                # fills are whole steps, a shortfall below half a step is noise
+                tolerance = step / 2
+            dust = abs(imbalance) - amount
+            if dust > noise:
+                logger.info(
+                    f"{dust} {symbol} on {leg.exchange} is below the amount step and stays as dust"
+                )
+            if amount <= 0:
+                return None
+            # market orders have no price, the limit of the leg estimates the cost
+            reason = self.market_table.validate(
+                leg.exchange, symbol, amount, leg.order["price"]
+            )
+            if reason:
+                logger.error(
+                    f"Cannot {self.partial_fill_action} {amount} {symbol} on {leg.exchange}, order invalid: {reason}. Open exposure {abs(imbalance)}"
+                )
+                return None
+        logger.warning(
+            f"Legs filled unevenly, {self.partial_fill_action} {side} {amount} {symbol} on {leg.exchange}"
+        )
+        order = {
+            "symbol": symbol,
+            "type": "market",
+            "side": side,
+            "amount": amount,
+            "price": None,
+        }
+        result = await self._submit(leg.exchange, order, params={})
+        if amount - result.filled > tolerance:
+            logger.error(
+                f"Could not {self.partial_fill_action} {amount} {symbol} on {leg.exchange}, open exposure {amount - result.filled}"
+            )
+        return result._replace(corrective=True)
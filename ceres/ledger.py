@@ -0,0 +1,218 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id TEXT PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    symbol TEXT NOT NULL,
+    buy_exchange TEXT NOT NULL,
+    sell_exchange TEXT NOT NULL,
+    amount REAL NOT NULL,
+    buy_price REAL,
+    sell_price REAL,
+    profit REAL NOT NULL,
+    fees REAL,
+    dry INTEGER NOT NULL,
+    unhedged REAL
+);
+CREATE INDEX IF NOT EXISTS trades_dry_timestamp ON trades (dry, timestamp);
+CREATE TABLE IF NOT EXISTS fills (
+    trade_id TEXT,
+    timestamp REAL NOT NULL,
+    exchange TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    side TEXT NOT NULL,
+    type TEXT NOT NULL,
+    amount REAL NOT NULL,
+    filled REAL NOT NULL,
+    price REAL,
+    order_id TEXT,
+    dry INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fills_trade_id ON fills (trade_id);
+CREATE TABLE IF NOT EXISTS balances (
+    exchange TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    free REAL NOT NULL,
+    used REAL NOT NULL,
+    total REAL NOT NULL,
+    timestamp REAL NOT NULL,
+    dry INTEGER NOT NULL,
+    PRIMARY KEY (dry, exchange, currency)
+);
+"""
+
+STATEMENTS = {
+    "trades": "INSERT OR REPLACE INTO trades VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    "fills": "INSERT INTO fills VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    "balances": "INSERT OR REPLACE INTO balances VALUES (?, ?, ?, ?, ?, ?, ?)",
+}
+
+_STOP = ("stop", ())
+
+
+class Ledger:
+    """
+    SQLite ledger of trades, fills and balances in WAL mode. Records are put
+    on a queue and written in batches by a background thread, so recording
+    never waits for the disk.
+    """
+
+    def __init__(self, config) -> None:
+        ledger_config = config.get("ledger", {})
+        self.path = ledger_config.get("path", "ceres.sqlite")
+        self.batch_size = ledger_config.get("batch_size", 100)
+        self.flush_interval = ledger_config.get("flush_interval", 1.0)
+        self._queue: "queue.SimpleQueue[Tuple[str, tuple]]" = queue.SimpleQueue()
+        self._conn = self._connect()
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self._writer = threading.Thread(
+            target=self._run, name="ceres-ledger", daemon=True
+        )
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _migrate(self) -> None:
+        """
+        Add columns missing in ledgers created by older versions
+        """
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(trades)")}
+        if "unhedged" not in columns:
+            with self._conn:
+                self._conn.execute("ALTER TABLE trades ADD COLUMN unhedged REAL")
+
+    def _run(self) -> None:
+        conn = self._connect()
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(
+                        self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                    )
+                except queue.Empty:
+                    break
+            rows: Dict[str, list] = {}
+            for table, row in batch:
+                if (table, row) == _STOP:
+                    stop = True
+                    continue
+                rows.setdefault(table, []).append(row)
+            try:
+                with conn:
+                    for table, values in rows.items():
+                        conn.executemany(STATEMENTS[table], values)
+            except sqlite3.Error as e:
+                logger.error(
+                    f"Could not write {len(batch)} ledger records. Message: {e}"
+                )
+        conn.close()
+
+    def record_trade(self, trade_id, symbol, orders, realized, dry) -> None:
+        """
+        :param realized: realized amount, buy_vwap, sell_vwap, profit, fees and
+        unhedged amount of the filled legs
+        """
+        legs = orders.get("exchange_orders")
+        buy_ex = next(ex for ex, order in legs.items() if order["side"] == "buy")
+        sell_ex = next(ex for ex, order in legs.items() if order["side"] == "sell")
+        self._queue.put(
+            (
+                "trades",
+                (
+                    trade_id,
+                    time.time(),
+                    symbol,
+                    buy_ex,
+                    sell_ex,
+                    realized["amount"],
+                    realized["buy_vwap"],
+                    realized["sell_vwap"],
+                    realized["profit"],
+                    realized["fees"],
+                    int(dry),
+                    realized["unhedged"],
+                ),
+            )
+        )
+
+    def record_fill(self, trade_id, exchange, order, filled, response, dry) -> None:
+        response = response or {}
+        self._queue.put(
+            (
+                "fills",
+                (
+                    trade_id,
+                    time.time(),
+                    exchange,
+                    order["symbol"],
+                    order["side"],
+                    order["type"],
+                    order["amount"],
+                    filled,
+                    response.get("average") or response.get("price") or order["price"],
+                    response.get("id"),
+                    int(dry),
+                ),
+            )
+        )
+
+    def record_balance(self, exchange, asset, dry) -> None:
+        self._queue.put(
+            (
+                "balances",
+                (
+                    exchange,
+                    asset.currency,
+                    asset.free,
+                    asset.used,
+                    asset.total,
+                    time.time(),
+                    int(dry),
+                ),
+            )
+        )
+
+    def totals(self, dry) -> Tuple[int, float]:
+        """
+        :return: number of trades and total profit
+        """
+        count, profit = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(profit), 0) FROM trades WHERE dry = ?",
+            (int(dry),),
+        ).fetchone()
+        return count, profit
+
+    def balances(self, dry) -> Dict[str, Dict[str, tuple]]:
+        """
+        :return: latest balance per exchange and currency as (free, used, total)
+        """
+        balances: Dict[str, Dict[str, tuple]] = {}
+        for exchange, currency, free, used, total in self._conn.execute(
+            "SELECT exchange, currency, free, used, total FROM balances WHERE dry = ?",
+            (int(dry),),
+        ):
+            balances.setdefault(exchange, {})[currency] = (free, used, total)
+        return balances
+
+    def close(self) -> None:
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+        self._conn.close()
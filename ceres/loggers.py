@@ -0,0 +1,91 @@
+import atexit
+import json
+import logging
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Optional
+
+
+LOGFORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One json object per line with time, level, logger, process, thread and
+    message, plus the traceback if there is one
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.process,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    QueueHandler that hands the record over unformatted, so merging the
+    arguments into the message happens in the listener thread. Arguments are
+    not copied, so they should not be changed after logging.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(config: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Log through a queue, a background thread writes the records to a
+    rotating file, which is only opened when the first record arrives.
+    Calling it again replaces the previous setup.
+    :param config: Configuration with optional logging section
+    """
+    global _listener
+    log_config = (config or {}).get("logging", {})
+    handler = RotatingFileHandler(
+        log_config.get("path", "logs.log"),
+        maxBytes=log_config.get("max_bytes", 10 * 1024 * 1024),
+        backupCount=log_config.get("backup_count", 5),
+        delay=True,
+    )
+    if log_config.get("format", "json") == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(LOGFORMAT, "[%X]"))
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    root = logging.getLogger()
+    previous = [h for h in root.handlers if isinstance(h, QueueHandler)]
+    root.addHandler(LazyQueueHandler(log_queue))
+    for h in previous:
+        root.removeHandler(h)
+    root.setLevel(log_config.get("level", "INFO"))
+    stop_logging()
+    _listener = listener
+
+
+def stop_logging() -> None:
+    """
+    Write the queued records and stop the background thread
+    """
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+atexit.register(stop_logging)
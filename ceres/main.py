@@ -2,22 +2,14 @@
 import logging
 import sys
 
-from rich.logging import RichHandler
-
 from ceres.cli import cli
+from ceres.loggers import setup_logging
 
 logger = logging.getLogger("ceres")
-LOGFORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-# logging.basicConfig(level=20, format=LOGFORMAT, handlers=[RichHandler())
-logging.basicConfig(
-    level=20,
-    format=LOGFORMAT,
-    datefmt="[%X]",
-    handlers=[logging.FileHandler("logs.log")],
-)
 
 
 def main() -> None:
+    setup_logging()
     try:
         cli()
     except KeyboardInterrupt:
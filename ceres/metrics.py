@@ -0,0 +1,156 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyHistogram:
+    """
+    HDR-style histogram of latencies in microseconds. Values below
+    2 * sub_buckets are counted exactly, above that every power of two is
+    split into sub_buckets linear buckets, so recording is O(1) and
+    percentiles have a relative error below 1 / sub_buckets.
+    """
+
+    def __init__(self, sub_buckets: int = 32, max_exponent: int = 36) -> None:
+        self.sub_buckets = sub_buckets
+        self._bits = sub_buckets.bit_length() - 1
+        self._max_value = (1 << max_exponent) - 1
+        self.counts = [0] * ((max_exponent - self._bits + 1) * sub_buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def _index(self, value: int) -> int:
+        if value < 2 * self.sub_buckets:
+            return value
+        shift = value.bit_length() - self._bits - 1
+        return shift * self.sub_buckets + (value >> shift)
+
+    def _lower_bound(self, index: int) -> int:
+        if index < 2 * self.sub_buckets:
+            return index
+        shift = index // self.sub_buckets - 1
+        return (index - shift * self.sub_buckets) << shift
+
+    def record(self, seconds: float) -> None:
+        """
+        Negative values from skewed clocks are counted as 0
+        """
+        seconds = max(seconds, 0.0)
+        value = min(int(seconds * 1e6), self._max_value)
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        """
+        :param q: percentile between 0 and 100
+        :return: latency in seconds
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, int(round(q / 100 * self.count)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self._lower_bound(index) / 1e6
+        return self.max
+
+
+class LatencyMetrics:
+    """
+    Latency histograms per stage and exchange:
+    feed: exchange timestamp of a book to local receive
+    evaluate: receive to the strategy decision
+    submit: decision to sending the order
+    ack: sending the order to the exchange response
+    total: receive to the exchange response
+    Exposed in Prometheus text format on a local HTTP endpoint if enabled and
+    logged as summary every log_interval seconds.
+    """
+
+    STAGES = ("feed", "evaluate", "submit", "ack", "total")
+    QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+    def __init__(self, config) -> None:
+        metrics_config = config.get("metrics", {})
+        self.enabled: bool = metrics_config.get("enabled", False)
+        self.host: str = metrics_config.get("host", "127.0.0.1")
+        self.port: int = metrics_config.get("port", 9108)
+        self.log_interval: float = metrics_config.get("log_interval", 60)
+        self.histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def record(self, stage: str, exchange: str, seconds: float) -> None:
+        histogram = self.histograms.get((stage, exchange))
+        if histogram is None:
+            histogram = self.histograms[(stage, exchange)] = LatencyHistogram()
+        histogram.record(seconds)
+
+    def _sorted(self) -> List[Tuple[Tuple[str, str], LatencyHistogram]]:
+        return sorted(
+            self.histograms.items(),
+            key=lambda item: (self.STAGES.index(item[0][0]), item[0][1]),
+        )
+
+    def prometheus(self) -> str:
+        lines = [
+            "# HELP ceres_latency_seconds Latency of a pipeline stage per exchange",
+            "# TYPE ceres_latency_seconds summary",
+        ]
+        for (stage, exchange), histogram in self._sorted():
+            labels = f'stage="{stage}",exchange="{exchange}"'
+            for q in self.QUANTILES:
+                lines.append(
+                    f'ceres_latency_seconds{{{labels},quantile="{q}"}} {histogram.percentile(q * 100)}'
+                )
+            lines.append(f"ceres_latency_seconds_sum{{{labels}}} {histogram.sum}")
+            lines.append(f"ceres_latency_seconds_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        return ", ".join(
+            f"{stage}/{exchange} p50 {histogram.percentile(50) * 1000:.1f} ms p99 {histogram.percentile(99) * 1000:.1f} ms (n={histogram.count})"
+            for (stage, exchange), histogram in self._sorted()
+        )
+
+    async def _handle(self, reader, writer) -> None:
+        try:
+            request = await reader.readline()
+            path = request.split()[1].decode() if len(request.split()) > 1 else ""
+            if path == "/metrics":
+                status, body = "200 OK", self.prometheus()
+            else:
+                status, body = "404 Not Found", "not found\n"
+            data = body.encode()
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                "Content-Type: text/plain; version=0.0.4\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                "Connection: close\r\n\r\n".encode() + data
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def run(self) -> None:
+        if self.enabled:
+            self._server = await asyncio.start_server(
+                self._handle, self.host, self.port
+            )
+            logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+        try:
+            while True:
+                await asyncio.sleep(self.log_interval)
+                if self.histograms:
+                    logger.info(f"Latency: {self.summary()}")
+        finally:
+            if self._server:
+                self._server.close()
@@ -0,0 +1,179 @@
+from typing import Optional
+
+import numpy as np
+
+
+class OrderBookSide:
+    """
+    One side of an order book in a preallocated (depth, 2) array of price and
+    amount. Prices are kept ascending so levels are found with a binary search.
+    Asks fill the array from the front (best first), bids from the back (best
+    last), so the best level never moves and both views are zero-copy.
+    With price_tick and amount_step set, levels are stored as int64 multiples
+    of them.
+    """
+
+    def __init__(
+        self,
+        depth: int,
+        is_bid: bool,
+        price_tick: Optional[float] = None,
+        amount_step: Optional[float] = None,
+    ) -> None:
+        self.depth = depth
+        self.is_bid = is_bid
+        self.fixed_point = price_tick is not None and amount_step is not None
+        self._scale = np.array([price_tick or 1.0, amount_step or 1.0])
+        self._data = np.zeros((depth, 2), dtype=np.int64 if self.fixed_point else float)
+        self._start = depth if is_bid else 0
+        self._end = depth if is_bid else 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def _encode(self, levels) -> np.ndarray:
+        arr = np.asarray(levels, dtype=float)[:, :2]
+        if self.fixed_point:
+            return np.rint(arr / self._scale).astype(np.int64)
+        return arr
+
+    def _key(self, price: float):
+        if self.fixed_point:
+            return int(round(price / self._scale[0]))
+        return price
+
+    def set(self, levels) -> None:
+        """
+        Replace the side with a snapshot given best level first
+        """
+        k = min(len(levels), self.depth)
+        if k == 0:
+            self._start = self._end = self.depth if self.is_bid else 0
+            return
+        arr = self._encode(levels[:k])
+        if self.is_bid:
+            self._start, self._end = self.depth - k, self.depth
+            self._data[self._start :] = arr[::-1]
+        else:
+            self._start, self._end = 0, k
+            self._data[:k] = arr
+
+    def apply(self, price: float, amount: float) -> None:
+        """
+        Insert, update or with amount 0 remove the level at price
+        """
+        key = self._key(price)
+        size = int(round(amount / self._scale[1])) if self.fixed_point else amount
+        prices = self._data[self._start : self._end, 0]
+        i = self._start + int(np.searchsorted(prices, key))
+        exists = i < self._end and self._data[i, 0] == key
+        if exists:
+            if size:
+                self._data[i, 1] = size
+            elif self.is_bid:
+                self._data[self._start + 1 : i + 1] = self._data[self._start : i]
+                self._start += 1
+            else:
+                self._data[i : self._end - 1] = self._data[i + 1 : self._end]
+                self._end -= 1
+            return
+        if not size:
+            return
+        if self.is_bid:
+            # bids grow towards the front, when full the worst level is dropped
+            if self._start == 0:
+                if i == 0:
+                    return
+                self._data[: i - 1] = self._data[1:i]
+            else:
+                self._data[self._start - 1 : i - 1] = self._data[self._start : i]
+                self._start -= 1
+            self._data[i - 1] = (key, size)
+        else:
+            if i >= self.depth:
+                return
+            end = min(self._end, self.depth - 1)
+            self._data[i + 1 : end + 1] = self._data[i:end]
+            self._end = end + 1
+            self._data[i] = (key, size)
+
+    def best_price(self) -> float:
+        """
+        Price of the best level without creating a view, nan if empty
+        """
+        if self._end == self._start:
+            return float("nan")
+        price = self._data[self._end - 1 if self.is_bid else self._start, 0]
+        return float(price * self._scale[0]) if self.fixed_point else float(price)
+
+    def view(self) -> np.ndarray:
+        """
+        Read-only zero-copy view of the raw levels, best level first
+        """
+        view = self._data[self._start : self._end]
+        if self.is_bid:
+            view = view[::-1]
+        view = view.view()
+        view.flags.writeable = False
+        return view
+
+    def levels(self) -> np.ndarray:
+        """
+        Levels as float prices and amounts, best level first. Zero-copy unless
+        the side is stored as fixed point.
+        """
+        view = self.view()
+        if self.fixed_point:
+            return view * self._scale
+        return view
+
+
+class OrderBook:
+    """
+    Local order book replica with bounded depth. Supports item access like a
+    ccxt order book so book["bids"][0][0] is the best bid price.
+    """
+
+    def __init__(
+        self,
+        symbol: str,
+        depth: int = 50,
+        price_tick: Optional[float] = None,
+        amount_step: Optional[float] = None,
+    ) -> None:
+        self.symbol = symbol
+        self.bids = OrderBookSide(depth, True, price_tick, amount_step)
+        self.asks = OrderBookSide(depth, False, price_tick, amount_step)
+        self.timestamp: Optional[int] = None
+        self.nonce: Optional[int] = None
+
+    def update(self, orderbook) -> None:
+        """
+        Replace both sides with a ccxt order book snapshot
+        """
+        self.bids.set(orderbook["bids"])
+        self.asks.set(orderbook["asks"])
+        self.timestamp = orderbook.get("timestamp")
+        self.nonce = orderbook.get("nonce")
+
+    @property
+    def best_bid(self) -> float:
+        return self.bids.best_price()
+
+    @property
+    def best_ask(self) -> float:
+        return self.asks.best_price()
+
+    def apply_delta(self, side: str, price: float, amount: float) -> None:
+        getattr(self, side).apply(price, amount)
+
+    def __getitem__(self, key: str):
+        if key in ("bids", "asks"):
+            return getattr(self, key).levels()
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except AttributeError:
+            return default
@@ -0,0 +1,156 @@
+import json
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+def tick_dtype(levels: int) -> np.dtype:
+    """
+    Fixed size record of one order book update with the top levels of both
+    sides as (price, amount), missing levels are nan
+    """
+    return np.dtype(
+        [
+            ("exchange", "u2"),
+            ("symbol", "u2"),
+            ("exchange_ts", "i8"),
+            ("receive_ts", "i8"),
+            ("bids", "f8", (levels, 2)),
+            ("asks", "f8", (levels, 2)),
+        ]
+    )
+
+
+class Recorder:
+    """
+    Appends order book updates to preallocated memory-mapped tick files. A
+    new file is started when records_per_file records are written. Exchange
+    and symbol names are stored as ids, the names are kept in a json header
+    next to every file. The next file is allocated, full files are flushed and
+    headers are written by a background thread, so recording never waits for
+    the disk.
+    """
+
+    def __init__(self, config) -> None:
+        recorder_config = config.get("recorder", {})
+        self.directory = Path(recorder_config.get("path", "data"))
+        self.levels: int = recorder_config.get("levels", 10)
+        self.records_per_file: int = recorder_config.get("records_per_file", 1000000)
+        self.dtype = tick_dtype(self.levels)
+        self.exchanges: List[str] = []
+        self.symbols: List[str] = []
+        self._exchange_ids: Dict[str, int] = {}
+        self._symbol_ids: Dict[str, int] = {}
+        self._file: Optional[Path] = None
+        self._ticks: Optional[np.memmap] = None
+        self._count = 0
+        self._sequence = 0
+        self._pool = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="ceres-recorder"
+        )
+        self._next: Optional["Future[Tuple[Path, np.memmap]]"] = None
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._rotate()
+
+    def _allocate(self) -> Tuple[Path, np.memmap]:
+        name = time.strftime("ticks_%Y%m%d_%H%M%S")
+        file = self.directory / f"{name}_{self._sequence:04d}.bin"
+        self._sequence += 1
+        ticks = np.memmap(
+            file, dtype=self.dtype, mode="w+", shape=(self.records_per_file,)
+        )
+        # fault in the first pages here, the first write to a new file is slow
+        ticks["receive_ts"][:256] = 0
+        return file, ticks
+
+    def _rotate(self) -> None:
+        """
+        Switch to the file allocated in the background, flush the full one and
+        allocate the next one in the background
+        """
+        if self._next is None:
+            self._next = self._pool.submit(self._allocate)
+        if self._ticks is not None:
+            self._pool.submit(self._finish, self._file, self._ticks, self._header())
+        self._file, self._ticks = self._next.result()
+        self._count = 0
+        self._pool.submit(self._write_header, self._file, self._header())
+        self._next = self._pool.submit(self._allocate)
+        logger.info(f"Recording order books to {self._file}")
+
+    def _header(self) -> Dict[str, Any]:
+        return {
+            "levels": self.levels,
+            "count": self._count,
+            "exchanges": list(self.exchanges),
+            "symbols": list(self.symbols),
+        }
+
+    @staticmethod
+    def _write_header(file: Path, header: Dict[str, Any]) -> None:
+        with file.with_suffix(".json").open(mode="w") as f:
+            json.dump(header, f)
+
+    def _finish(self, file: Path, ticks: np.memmap, header: Dict[str, Any]) -> None:
+        ticks.flush()
+        self._write_header(file, header)
+
+    def _id(self, names: List[str], ids: Dict[str, int], name: str) -> int:
+        id = ids.get(name)
+        if id is None:
+            id = ids[name] = len(names)
+            names.append(name)
+            self._pool.submit(self._write_header, self._file, self._header())
+        return id
+
+    def record(self, exchange: str, symbol: str, orderbook, receive_ts: int) -> None:
+        """
+        :param orderbook: OrderBook or ccxt order book
+        :param receive_ts: local receive time in ns since epoch
+        """
+        if self._count >= self.records_per_file:
+            self._rotate()
+        tick = self._ticks[self._count]
+        tick["exchange"] = self._id(self.exchanges, self._exchange_ids, exchange)
+        tick["symbol"] = self._id(self.symbols, self._symbol_ids, symbol)
+        tick["exchange_ts"] = orderbook.get("timestamp") or 0
+        tick["receive_ts"] = receive_ts
+        for side in ("bids", "asks"):
+            levels = np.asarray(orderbook[side], dtype=float)[: self.levels, :2]
+            tick[side][: len(levels)] = levels
+            tick[side][len(levels) :] = np.nan
+        self._count += 1
+
+    def close(self) -> None:
+        if self._ticks is None:
+            return
+        self._pool.submit(self._finish, self._file, self._ticks, self._header())
+        self._ticks = None
+        if self._next is not None:
+            # the preallocated file was never written, it has no header
+            file, _ = self._next.result()
+            file.unlink()
+            self._next = None
+        self._pool.shutdown(wait=True)
+
+
+def read_ticks(path) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Memory-map a tick file without parsing it
+    :return: records and header with exchange and symbol names
+    """
+    path = Path(path)
+    with path.with_suffix(".json").open() as file:
+        header = json.load(file)
+    ticks = np.memmap(path, dtype=tick_dtype(header["levels"]), mode="r")
+    # unwritten records of a file that was not closed have receive_ts 0
+    empty = np.flatnonzero(ticks["receive_ts"] == 0)
+    count = empty[0] if len(empty) else len(ticks)
+    return ticks[:count], header
@@ -1 +1,2 @@
+from ceres.remote.notifier import Notifier
 from ceres.remote.telegram import Telegram
@@ -0,0 +1,113 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class Notifier:
+    """
+    Sends messages from a background thread so callers never wait for the
+    remote API. Messages arriving within coalesce_interval of each other are
+    joined into one digest and at most rate_limit digests are sent per
+    minute, messages piling up meanwhile go into the next digest. When the
+    queue is full new messages are dropped and only counted.
+    """
+
+    MAX_LENGTH = 4096
+
+    def __init__(self, config: Dict[str, Any], send: Callable[[str], None]) -> None:
+        notifier_config = config.get("notifications", {})
+        self.send = send
+        self.coalesce_interval: float = notifier_config.get("coalesce_interval", 2.0)
+        self.rate_limit: int = notifier_config.get("rate_limit", 20)
+        self.max_batch: int = notifier_config.get("max_batch", 50)
+        self._queue: queue.Queue = queue.Queue(
+            maxsize=notifier_config.get("max_queue", 100)
+        )
+        self._sent: Deque[float] = deque()
+        self._dropped = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+        self._thread.start()
+
+    def notify(self, message: str) -> None:
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+
+    def _drain(self, messages: List[str], deadline: Optional[float] = None) -> bool:
+        """
+        Add queued messages, waiting for more until deadline if given
+        :return: True if close was requested
+        """
+        while len(messages) < self.max_batch:
+            try:
+                if deadline is None:
+                    message = self._queue.get_nowait()
+                else:
+                    timeout = max(0.0, deadline - time.monotonic())
+                    message = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                return False
+            if message is None:
+                return True
+            messages.append(message)
+        return False
+
+    def _wait_for_rate_limit(self) -> None:
+        now = time.monotonic()
+        while self._sent and self._sent[0] <= now - 60:
+            self._sent.popleft()
+        if len(self._sent) >= self.rate_limit:
+            time.sleep(self._sent[0] + 60 - now)
+            self._sent.popleft()
+
+    def _digest(self, messages: List[str]) -> str:
+        with self._lock:
+            dropped, self._dropped = self._dropped, 0
+        if len(messages) == 1:
+            text = messages[0]
+        else:
+            text = f"{len(messages)} notifications:\n\n" + "\n\n".join(messages)
+        if dropped:
+            text += f"\n\n{dropped} notifications dropped"
+        if len(text) > self.MAX_LENGTH:
+            text = text[: self.MAX_LENGTH - 20] + "\n... (truncated)"
+        return text
+
+    def _run(self) -> None:
+        while True:
+            message = self._queue.get()
+            if message is None:
+                return
+            messages = [message]
+            stop = self._drain(messages, time.monotonic() + self.coalesce_interval)
+            self._wait_for_rate_limit()
+            # messages that arrived while waiting go into this digest as well
+            if not stop:
+                stop = self._drain(messages)
+            try:
+                self.send(self._digest(messages))
+            except Exception:
+                logger.exception("Sending notification failed")
+            self._sent.append(time.monotonic())
+            if stop:
+                return
+
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        Send what is queued and stop the worker
+        """
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning("Notification queue full on close, dropping messages")
+            return
+        self._thread.join(timeout)
@@ -5,6 +5,8 @@ from telegram import ParseMode, Update
 from telegram.error import NetworkError, TelegramError
 from telegram.ext import CallbackContext, CommandHandler, Updater
 
+from ceres.remote.notifier import Notifier
+
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +26,7 @@ class Telegram:
         self.token = self._config["telegram"]["token"]
         self.chat_id = self._config["telegram"]["chat_id"]
         self._updater = Updater(token=self.token, use_context=True)
+        self._notifier = Notifier(self._config, self._send_message)
         self._init()
 
     def _init(self) -> None:
@@ -83,9 +86,22 @@ class Telegram:
         """
         self._send_message(f"*Ceres version:* {0.1}")
 
-    def send_message(self,msg) -> None:
-        
-        self._send_message(msg) 
+    def send_message(self, msg) -> None:
+        """
+        Queue a message, it is sent in the background and may be joined with
+        other messages into one digest
+        :param msg: message
+        :return: None
+        """
+        self._notifier.notify(msg)
+
+    def close(self) -> None:
+        """
+        Send queued messages and stop polling
+        :return: None
+        """
+        self._notifier.close()
+        self._updater.stop()
 
     def _send_message(self, message: str, parse_mode: str = ParseMode.MARKDOWN) -> None:
         """
@@ -0,0 +1,160 @@
+import logging
+import time
+from typing import List, Optional
+
+import numpy as np
+from rich.table import Table
+
+from ceres.exchange import ExchangesHandler, OrderBookEngine
+
+
+logger = logging.getLogger(__name__)
+
+
+class OpportunityScanner:
+    """
+    Tracks the best bid and ask of many symbols on all configured exchanges in
+    symbols x exchanges matrices and finds the best buy and sell exchange of
+    every symbol in one vectorized pass
+    """
+
+    def __init__(self, config, dashboard, exchangeshandler=None, stream=True) -> None:
+        """
+        :param stream: stream the order books in this process, False if the
+            quotes are filled in from elsewhere
+        """
+        self._config = config
+        self._scanner_config = self._config.get("scanner", {})
+        self.dashboard = dashboard
+        self.exchangeshandler = exchangeshandler or ExchangesHandler(self._config)
+        self.exchanges: List[str] = self.exchangeshandler.current_exchanges
+        self.min_spread = self._scanner_config.get("min_spread", 0.001)
+        self.max_age = self._config.get("max_quote_age", 5)
+        self.top = self._scanner_config.get("top", 10)
+        self.symbols: List[str] = self._get_symbols()
+        self._symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._exchange_index = {ex: j for j, ex in enumerate(self.exchanges)}
+        shape = (len(self.symbols), len(self.exchanges))
+        self.bids = np.full(shape, np.nan)
+        self.asks = np.full(shape, np.nan)
+        self.updated = np.full(shape, -np.inf)
+        self.fees = self._get_fees(shape)
+        self.engine: Optional[OrderBookEngine] = None
+        if stream:
+            self.engine = OrderBookEngine(
+                self._config, self.exchangeshandler, self.symbols, self._on_order_book
+            )
+
+    def _get_symbols(self) -> List[str]:
+        """
+        Configured symbols, otherwise every active spot market listed on at
+        least quorum exchanges, optionally filtered by quote currency
+        """
+        symbols = self._scanner_config.get("symbols", [])
+        if symbols:
+            return symbols
+        quote = self._scanner_config.get("quote")
+        min_exchanges = self._config.get("quorum", 2)
+        counts = {}
+        for market in self.exchangeshandler.get_markets().values():
+            for symbol, m in market.items():
+                if not m.get("spot") or m.get("active") is False:
+                    continue
+                if quote and m.get("quote") != quote:
+                    continue
+                counts[symbol] = counts.get(symbol, 0) + 1
+        symbols = sorted(s for s, count in counts.items() if count >= min_exchanges)
+        max_symbols = self._scanner_config.get("max_symbols", 200)
+        logger.info(
+            f"Scanning {min(len(symbols), max_symbols)} of {len(symbols)} common symbols"
+        )
+        return symbols[:max_symbols]
+
+    def _get_fees(self, shape) -> np.ndarray:
+        fees = np.full(shape, np.nan)
+        markets = self.exchangeshandler.get_markets()
+        for ex, j in self._exchange_index.items():
+            for symbol, i in self._symbol_index.items():
+                m = markets[ex].get(symbol)
+                if m:
+                    fees[i, j] = m.get("taker", 0.001)
+        return fees
+
+    def update(self, exchange: str, symbol: str, orderbook) -> None:
+        i = self._symbol_index[symbol]
+        j = self._exchange_index[exchange]
+        self.bids[i, j] = orderbook.best_bid
+        self.asks[i, j] = orderbook.best_ask
+        self.updated[i, j] = time.monotonic()
+
+    def scan(self):
+        """
+        Best buy and sell exchange and net of fee spread for every symbol
+        :return: buy exchange index, sell exchange index, spread per symbol
+        """
+        fresh = (time.monotonic() - self.updated) <= self.max_age
+        fresh &= ~np.isnan(self.fees)
+        eff_asks = np.where(fresh, self.asks * (1 + self.fees), np.inf)
+        eff_bids = np.where(fresh, self.bids * (1 - self.fees), -np.inf)
+        buy = eff_asks.argmin(axis=1)
+        sell = eff_bids.argmax(axis=1)
+        rows = np.arange(len(self.symbols))
+        best_ask = eff_asks[rows, buy]
+        best_bid = eff_bids[rows, sell]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            spread = (best_bid - best_ask) / best_ask
+        spread[~np.isfinite(spread)] = np.nan
+        return buy, sell, spread
+
+    def opportunities(self):
+        buy, sell, spread = self.scan()
+        found = np.flatnonzero(np.nan_to_num(spread, nan=-np.inf) > self.min_spread)
+        found = found[np.argsort(-spread[found])]
+        return [
+            {
+                "symbol": self.symbols[i],
+                "buy": self.exchanges[buy[i]],
+                "ask": float(self.asks[i, buy[i]]),
+                "sell": self.exchanges[sell[i]],
+                "bid": float(self.bids[i, sell[i]]),
+                "spread": float(spread[i]),
+            }
+            for i in found
+        ]
+
+    async def _on_order_book(self, exchange, symbol, exchanges):
+        self.update(exchange, symbol, self.engine.store.get(exchange, symbol))
+        self.publish()
+
+    def publish(self) -> None:
+        opportunities = self.opportunities()
+        for opp in opportunities:
+            logger.debug(f"Scanner opportunity: {opp}")
+        self.dashboard.update(
+            "profit",
+            opportunities[: self.top],
+            title="Scanner",
+            border_style="red",
+            render=self._generate_table,
+        )
+
+    def _generate_table(self, opportunities) -> Table:
+        table = Table(expand=True)
+        for column in ("Symbol", "Buy", "Ask", "Sell", "Bid", "Spread %"):
+            table.add_column(column)
+        for opp in opportunities:
+            table.add_row(
+                opp["symbol"],
+                opp["buy"],
+                f'{opp["ask"]}',
+                opp["sell"],
+                f'{opp["bid"]}',
+                f'{opp["spread"] * 100:.3f}',
+            )
+        return table
+
+    def run(self):
+        try:
+            self.exchangeshandler.loop.run_until_complete(self.engine.run())
+        finally:
+            self.exchangeshandler.close()
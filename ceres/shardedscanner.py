@@ -0,0 +1,238 @@
+import logging
+import math
+import multiprocessing
+import signal
+import time
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ceres.exchange import ExchangesHandler, OrderBookEngine
+from ceres.loggers import setup_logging
+from ceres.scanner import OpportunityScanner
+
+
+logger = logging.getLogger(__name__)
+
+
+class SharedQuotes:
+    """
+    Best bid, ask and update time per symbol and exchange in shared memory.
+    Every cell has a sequence number that is odd while a writer changes it,
+    so readers can skip cells they caught in the middle of a write. Update
+    times are time.monotonic(), which is the same clock in all processes.
+    """
+
+    def __init__(self, shape: Tuple[int, int], name: Optional[str] = None) -> None:
+        cells = shape[0] * shape[1]
+        self.owner = name is None
+        if self.owner:
+            self._shm = SharedMemory(create=True, size=max(1, 4 * cells * 8))
+        else:
+            self._shm = SharedMemory(name=name)
+        values = np.ndarray((3,) + shape, dtype=np.float64, buffer=self._shm.buf)
+        self.bids, self.asks, self.updated = values
+        self.seq = np.ndarray(
+            shape, dtype=np.int64, buffer=self._shm.buf, offset=3 * cells * 8
+        )
+        if self.owner:
+            self.bids.fill(np.nan)
+            self.asks.fill(np.nan)
+            self.updated.fill(-np.inf)
+            self.seq.fill(0)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def write(self, i: int, j: int, bid: float, ask: float, updated: float) -> None:
+        self.seq[i, j] += 1
+        self.bids[i, j] = bid
+        self.asks[i, j] = ask
+        self.updated[i, j] = updated
+        self.seq[i, j] += 1
+
+    def read_into(self, bids: np.ndarray, asks: np.ndarray, updated: np.ndarray):
+        """
+        Copy all cells that were not being written into the given arrays
+        :return: number of skipped cells
+        """
+        before = self.seq.copy()
+        values = np.stack((self.bids, self.asks, self.updated))
+        consistent = (before == self.seq) & (before % 2 == 0)
+        np.copyto(bids, values[0], where=consistent)
+        np.copyto(asks, values[1], where=consistent)
+        np.copyto(updated, values[2], where=consistent)
+        return int(consistent.size - consistent.sum())
+
+    def close(self) -> None:
+        # numpy views have to be released before the buffer can be closed
+        del self.bids, self.asks, self.updated, self.seq
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
+
+
+def shard_subscriptions(
+    subscriptions: Dict[str, List[str]], processes: int
+) -> List[Dict[str, List[str]]]:
+    """
+    Split the symbols of every exchange into chunks, more than one per
+    exchange only if there are more processes than exchanges, and give every
+    chunk to the process with the fewest symbols so far
+    """
+    subscriptions = {ex: symbols for ex, symbols in subscriptions.items() if symbols}
+    chunks_per_exchange = max(1, math.ceil(processes / max(1, len(subscriptions))))
+    chunks = []
+    for ex, symbols in subscriptions.items():
+        n = min(chunks_per_exchange, max(1, len(symbols)))
+        size = math.ceil(len(symbols) / n)
+        chunks += [(ex, symbols[k : k + size]) for k in range(0, len(symbols), size)]
+    shards: List[Dict[str, List[str]]] = [{} for _ in range(processes)]
+    loads = [0] * processes
+    for ex, symbols in sorted(chunks, key=lambda chunk: -len(chunk[1])):
+        k = loads.index(min(loads))
+        shards[k].setdefault(ex, []).extend(symbols)
+        loads[k] += len(symbols)
+    return [shard for shard in shards if shard]
+
+
+def run_shard(config, index, name, shape, symbols, exchanges, subscriptions) -> None:
+    """
+    Worker process: streams the subscribed order books on its own loop and
+    writes the best bid and ask into the shared quotes. Order books are
+    recorded into a directory of its own.
+    """
+    # terminate() stops the worker like Ctrl-C, so tick files are closed
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    log_config = config.get("logging", {})
+    path = Path(log_config.get("path", "logs.log"))
+    setup_logging(
+        {
+            "logging": {
+                **log_config,
+                "path": str(path.with_suffix(f".{index}{path.suffix}")),
+            }
+        }
+    )
+    quotes = SharedQuotes(shape, name)
+    recorder_config = config.get("recorder", {})
+    shard_config = {
+        **config,
+        "exchanges": [ex for ex in config["exchanges"] if ex["name"] in subscriptions],
+        "recorder": {
+            **recorder_config,
+            "path": f"{recorder_config.get('path', 'data')}.{index}",
+        },
+    }
+    symbol_index = {symbol: i for i, symbol in enumerate(symbols)}
+    exchange_index = {ex: j for j, ex in enumerate(exchanges)}
+
+    async def on_update(exchange, symbol, fresh):
+        ob = engine.store.get(exchange, symbol)
+        quotes.write(
+            symbol_index[symbol],
+            exchange_index[exchange],
+            ob.best_bid,
+            ob.best_ask,
+            time.monotonic(),
+        )
+
+    handler = None
+    engine = None
+    try:
+        handler = ExchangesHandler(shard_config)
+        engine = OrderBookEngine(
+            shard_config, handler, subscriptions, on_update, quorum=1
+        )
+        handler.loop.run_until_complete(engine.run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if handler:
+            handler.close()
+        if engine and engine.recorder:
+            engine.recorder.close()
+        quotes.close()
+
+
+class ShardedScanner:
+    """
+    OpportunityScanner with the order book streams spread over worker
+    processes, each with its own ccxt.pro loop. Workers publish best quotes
+    into SharedQuotes, the coordinator copies them into the scanner matrices
+    every interval seconds and scans them. Dead workers are restarted.
+    """
+
+    def __init__(self, config, dashboard, processes: int) -> None:
+        self._config = config
+        self.processes = processes
+        self.interval = self._config.get("scanner", {}).get("interval", 0.1)
+        self.exchangeshandler = ExchangesHandler(self._config)
+        # the coordinator loop does not run, reload expired markets here once
+        # so the workers start from a fresh cache instead of all reloading it
+        self.exchangeshandler.wait_for_markets()
+        self.scanner = OpportunityScanner(
+            config, dashboard, self.exchangeshandler, stream=False
+        )
+        markets = self.exchangeshandler.get_markets()
+        subscriptions = {
+            ex: [s for s in self.scanner.symbols if s in markets[ex]]
+            for ex in self.scanner.exchanges
+        }
+        self.shards = shard_subscriptions(subscriptions, processes)
+        self.quotes: Optional[SharedQuotes] = None
+        self._context = multiprocessing.get_context("spawn")
+        self._workers: List[multiprocessing.process.BaseProcess] = []
+
+    def _start_worker(self, index: int):
+        worker = self._context.Process(
+            target=run_shard,
+            args=(
+                self._config,
+                index,
+                self.quotes.name,  # type: ignore
+                self.scanner.bids.shape,
+                self.scanner.symbols,
+                self.scanner.exchanges,
+                self.shards[index],
+            ),
+            daemon=True,
+        )
+        worker.start()
+        return worker
+
+    def run(self):
+        self.quotes = SharedQuotes(self.scanner.bids.shape)
+        try:
+            self._workers = [self._start_worker(k) for k in range(len(self.shards))]
+            logger.info(
+                f"Started {len(self._workers)} scanner processes for {len(self.scanner.symbols)} symbols"
+            )
+            while True:
+                time.sleep(self.interval)
+                for k, worker in enumerate(self._workers):
+                    if not worker.is_alive():
+                        logger.warning(
+                            f"Scanner process {k} exited with code {worker.exitcode}, restarting"
+                        )
+                        self._workers[k] = self._start_worker(k)
+                self.quotes.read_into(
+                    self.scanner.bids, self.scanner.asks, self.scanner.updated
+                )
+                self.scanner.publish()
+        finally:
+            self.stop()
+
+    def stop(self):
+        for worker in self._workers:
+            worker.terminate()
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+        if self.quotes:
+            self.quotes.close()
+            self.quotes = None
+        self.exchangeshandler.close()
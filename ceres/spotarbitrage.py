@@ -1,21 +1,32 @@
 import logging
 
+import numpy as np
+
+from ceres.depth import Execution, affordable_amount, best_execution, levels
+from ceres.exchange.markettable import MarketTable
 from ceres.utils import generate_table
 
 logger = logging.getLogger(__name__)
 
 
 class SpotArbitrage:
-    def __init__(self, config, exchangeshandler, dashboard) -> None:
+    def __init__(self, config, exchangeshandler, dashboard, wallets=None) -> None:
         self._config = config
         self.exchangeshandler = exchangeshandler
         self.dashboard = dashboard
+        self.wallets = wallets
         self.symbol = self._config.get("symbol")
+        self.base, self.quote = self.symbol.split("/")
         self.order_size = self._config.get("order_size", 0)
+        self.max_pairs = self._config.get("max_pairs", 0)
         self.bids = {}
         self.asks = {}
+        self.orderbooks = {}
         self.fees = {}
         self._get_fees()
+        self.exchangeshandler.add_markets_listener(self._get_fees)
+        self.market_table = MarketTable(self.exchangeshandler, [self.symbol])
+        self.exchangeshandler.add_markets_listener(self.market_table.build)
 
     def _get_fees(self):
         """
@@ -29,95 +40,223 @@ class SpotArbitrage:
                     "taker": m.get("taker", 0.001),
                     "maker": m.get("maker", 0.001),
                 }
-        logger.info(f"Fees per exchange: {self.fees}")
+        logger.info("Fees per exchange: %s", self.fees)
 
-    def check_opportunity(self):
-        self.get_orderbook_data()
-        return self.check_profit()
+    def check_opportunity(self, obs, exchanges):
+        self.get_orderbook_data(obs, exchanges)
+        return self.check_profit(exchanges)
 
-    def get_orderbook_data(self):
-        obs = self.exchangeshandler.watch_order_books(self.symbol)
-        current_exchanges = self.exchangeshandler.current_exchanges
+    def get_orderbook_data(self, obs, exchanges):
+        """
+        :param obs: latest OrderBook per exchange
+        :param exchanges: exchanges with a fresh order book
+        """
+        for ex in exchanges:
+            self.orderbooks[ex] = obs[ex]
+            self.bids[ex] = obs[ex].best_bid
+            self.asks[ex] = obs[ex].best_ask
         self.dashboard.update(
             "orderbook",
-            generate_table(obs, current_exchanges),
+            {ex: (self.bids[ex], self.asks[ex]) for ex in exchanges},
             title="Orderbook",
             border_style="green",
+            render=generate_table,
         )
-        for ex in current_exchanges:
-            self.bids[ex] = obs[ex]["bids"][0][0]
-            self.asks[ex] = obs[ex]["asks"][0][0]
-
-    def check_profit(self):
-        min_ask_ex = min(self.asks, key=self.asks.get)  # type: ignore
-        max_bid_ex = max(self.bids, key=self.bids.get)  # type: ignore
-        min_ask_price = self.asks[min_ask_ex]
-        max_bid_price = self.bids[max_bid_ex]
-
-        min_fee = self.order_size * min_ask_price * self.fees[min_ask_ex]["taker"]
-        max_fee = self.order_size * max_bid_price * self.fees[max_bid_ex]["taker"]
-
-        price_profit = max_bid_price - min_ask_price
-        profit = (price_profit * self.order_size) - (min_fee) - (max_fee)
-        profit_pct = profit / 100
-        logger.debug(
-            f"{self.symbol}: Profit after fees: {profit}, buy exchange {min_ask_ex} at: {min_ask_price}, sell exchange {max_bid_ex} at: {max_bid_price}"
+
+    def _budget(self, buy_ex) -> float:
+        """
+        Free quote currency on the buy exchange, less a tiny margin so float
+        noise in the sizing cannot exceed it
+        """
+        if self.wallets is None:
+            return np.inf
+        return self.wallets.get_free(buy_ex, self.quote) * (1 - 1e-9)
+
+    def _max_amount(self, buy_ex, sell_ex, asks):
+        """
+        Upper bound for the amount from order_size and free balances, the
+        vwap bound of the budget is refined at the limit price by the walk
+        """
+        max_amount = self.order_size if self.order_size > 0 else np.inf
+        if self.wallets is None:
+            return max_amount
+        budget = self._budget(buy_ex) / (1 + self.fees[buy_ex]["taker"])
+        return min(
+            max_amount,
+            affordable_amount(asks, budget),
+            self.wallets.get_free(sell_ex, self.base),
         )
+
+    def spread_matrix(self, exchanges) -> np.ndarray:
+        """
+        Top of book spread after taker fees for every pair of exchanges
+        :return: array of shape (n, n), entry [i, j] is the profit per quote
+            spent of buying on exchanges[i] and selling on exchanges[j]
+        """
+        asks = np.array([self.asks[ex] for ex in exchanges], dtype=float)
+        bids = np.array([self.bids[ex] for ex in exchanges], dtype=float)
+        taker = np.array([self.fees[ex]["taker"] for ex in exchanges])
+        buy_cost = asks * (1 + taker)
+        spreads = (bids * (1 - taker))[None, :] / buy_cost[:, None] - 1
+        spreads[np.isnan(spreads)] = -np.inf
+        np.fill_diagonal(spreads, -np.inf)
+        return spreads
+
+    def allocate(self, exchanges, spreads):
+        """
+        Pick pairs greedily from the highest spread down, every exchange is
+        used by at most one pair so the pairs do not compete for balances.
+        Each pair is sized by walking both books within the free balances,
+        the buy has to be affordable at its rounded limit price.
+        :return: list of (buy exchange, sell exchange, Execution)
+        """
+        spreads = spreads.copy()
+        pairs = []
+        while not self.max_pairs or len(pairs) < self.max_pairs:
+            i, j = np.unravel_index(np.argmax(spreads), spreads.shape)
+            if spreads[i, j] <= 0:
+                break
+            buy_ex, sell_ex = exchanges[i], exchanges[j]
+            asks = levels(self.orderbooks[buy_ex]["asks"])
+            bids = levels(self.orderbooks[sell_ex]["bids"])
+            max_amount = min(
+                self._max_amount(buy_ex, sell_ex, asks),
+                self.market_table.get(buy_ex, self.symbol).max_amount,
+                self.market_table.get(sell_ex, self.symbol).max_amount,
+            )
+            execution = best_execution(
+                asks,
+                bids,
+                self.fees[buy_ex]["taker"],
+                self.fees[sell_ex]["taker"],
+                max_amount,
+                self.market_table.common_step([buy_ex, sell_ex], self.symbol),
+                self._budget(buy_ex),
+                self.market_table.get(buy_ex, self.symbol).price_tick,
+            )
+            if execution.profit > 0:
+                execution = self._fit_to_markets(buy_ex, sell_ex, execution)
+            if execution.profit <= 0:
+                # e.g. no balance for this pair, others may still work
+                spreads[i, j] = -np.inf
+                continue
+            pairs.append((buy_ex, sell_ex, execution))
+            spreads[[i, j], :] = -np.inf
+            spreads[:, [i, j]] = -np.inf
+        return pairs
+
+    def _fit_to_markets(self, buy_ex, sell_ex, execution) -> Execution:
+        """
+        Round the prices to the market precision of both exchanges, the
+        amount already is on the common amount step of both
+        :return: the rounded execution, an empty one if an order would be
+            rejected for its limits
+        """
+        buy_price = self.market_table.round_price(
+            buy_ex, self.symbol, "buy", execution.buy_price
+        )
+        sell_price = self.market_table.round_price(
+            sell_ex, self.symbol, "sell", execution.sell_price
+        )
+        for ex, price in ((buy_ex, buy_price), (sell_ex, sell_price)):
+            reason = self.market_table.validate(
+                ex, self.symbol, execution.amount, price
+            )
+            if reason:
+                logger.debug(
+                    "%s: Skipping %s to %s, order on %s invalid: %s",
+                    self.symbol,
+                    buy_ex,
+                    sell_ex,
+                    ex,
+                    reason,
+                )
+                return Execution()
+        return execution._replace(buy_price=buy_price, sell_price=sell_price)
+
+    def check_profit(self, exchanges):
+        """
+        :return: signal and the orders of every allocated pair, most
+            profitable first
+        """
+        buy_costs = {
+            ex: self.asks[ex] * (1 + self.fees[ex]["taker"]) for ex in exchanges
+        }
+        sell_proceeds = {
+            ex: self.bids[ex] * (1 - self.fees[ex]["taker"]) for ex in exchanges
+        }
+        min_ask_ex = min(buy_costs, key=buy_costs.get)  # type: ignore
+        max_bid_ex = max(sell_proceeds, key=sell_proceeds.get)  # type: ignore
+        if sell_proceeds[max_bid_ex] <= buy_costs[min_ask_ex]:
+            # no pair is profitable at the top of the books, so none deeper either
+            pairs = []
+        else:
+            pairs = self.allocate(exchanges, self.spread_matrix(exchanges))
+            pairs.sort(key=lambda pair: -pair[2].profit)
+        shown = pairs[0] if pairs else (min_ask_ex, max_bid_ex, Execution())
+        for buy_ex, sell_ex, execution in pairs:
+            logger.debug(
+                "%s: Profit after fees: %s for %s, buy exchange %s vwap: %s, sell exchange %s vwap: %s",
+                self.symbol,
+                execution.profit,
+                execution.amount,
+                buy_ex,
+                execution.buy_vwap,
+                sell_ex,
+                execution.sell_vwap,
+            )
         self.dashboard.update(
             "profit",
-            f"{self.symbol} \nProfit after fees: {profit} \nBuy exchange {min_ask_ex} at: {min_ask_price} \nSell exchange {max_bid_ex} at: {max_bid_price}",
+            (self.symbol, shown[2], shown[0], shown[1], len(pairs)),
             title="Profit",
             border_style="red",
+            render=self._profit_text,
         )
-        if profit > 0:
-            orders = self._create_orders(
-                min_ask_ex,
-                min_ask_price,
-                max_bid_ex,
-                max_bid_price,
-                profit,
-                profit_pct,
-                min_fee,
-                max_fee,
+        if not pairs:
+            return False, []
+        opportunities = []
+        for buy_ex, sell_ex, execution in pairs:
+            buy_cost = execution.amount * execution.buy_vwap
+            profit_pct = execution.profit / buy_cost * 100 if buy_cost else 0
+            opportunities.append(
+                self._create_orders(buy_ex, sell_ex, execution, profit_pct)
             )
             logger.info(
-                f"Found arbitrage opportunity for {self.symbol} between {min_ask_ex} and {max_bid_ex}"
+                "Found arbitrage opportunity for %s between %s and %s",
+                self.symbol,
+                buy_ex,
+                sell_ex,
             )
-            return True, orders
-
-        return False, {}
-
-    def _create_orders(
-        self,
-        min_ask_ex,
-        min_ask_price,
-        max_bid_ex,
-        max_bid_price,
-        profit,
-        profit_pct,
-        min_fee,
-        max_fee,
-    ):
+        return True, opportunities
+
+    @staticmethod
+    def _profit_text(data):
+        symbol, execution, min_ask_ex, max_bid_ex, pairs = data
+        return f"{symbol} \nProfit after fees: {execution.profit} \nAmount: {execution.amount} \nBuy exchange {min_ask_ex} at: {execution.buy_vwap} \nSell exchange {max_bid_ex} at: {execution.sell_vwap} \nPairs: {pairs}"
+
+    def _create_orders(self, min_ask_ex, max_bid_ex, execution, profit_pct):
         return {
             "exchange_orders": {
                 min_ask_ex: {
                     "symbol": self.symbol,
                     "type": "limit",
                     "side": "buy",
-                    "amount": self.order_size,
-                    "price": min_ask_price,
+                    "amount": execution.amount,
+                    "price": execution.buy_price,
                 },
                 max_bid_ex: {
                     "symbol": self.symbol,
                     "type": "limit",
                     "side": "sell",
-                    "amount": self.order_size,
-                    "price": max_bid_price,
+                    "amount": execution.amount,
+                    "price": execution.sell_price,
                 },
             },
             "profit": {
-                "profit": profit,
+                "profit": execution.profit,
                 "profit_pct": profit_pct,
-                "fees": min_fee + max_fee,
+                "fees": execution.buy_fee + execution.sell_fee,
+                "buy_vwap": execution.buy_vwap,
+                "sell_vwap": execution.sell_vwap,
             },
         }
@@ -0,0 +1,182 @@
+import logging
+import math
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+from ceres.exchange import ExchangesHandler, OrderBookEngine
+
+
+logger = logging.getLogger(__name__)
+
+
+class Edge(NamedTuple):
+    symbol: str
+    side: str
+    source: str
+    target: str
+
+
+class CurrencyGraph:
+    """
+    Currency graph of one exchange. Every market BASE/QUOTE adds the edges
+    QUOTE -> BASE (buy at ask) and BASE -> QUOTE (sell at bid) with weight
+    -log(rate after fee), so a cycle is profitable when its weights sum below 0.
+    All triangles starting at a start currency are precomputed together with
+    the triangles every edge is part of.
+    """
+
+    def __init__(self, markets, start_currencies: List[str], max_symbols: int) -> None:
+        self.edges: List[Edge] = []
+        self.fees: List[float] = []
+        self._edge_index: Dict[Tuple[str, str], int] = {}
+        self._market_edges: Dict[str, Tuple[int, int]] = {}
+        self._adjacency: Dict[str, List[str]] = {}
+        for symbol, m in markets.items():
+            if not m.get("spot") or m.get("active") is False:
+                continue
+            base, quote = m["base"], m["quote"]
+            fee = m.get("taker", 0.001)
+            buy = self._add_edge(Edge(symbol, "buy", quote, base), fee)
+            sell = self._add_edge(Edge(symbol, "sell", base, quote), fee)
+            self._market_edges[symbol] = (buy, sell)
+        cycles = self._find_cycles(start_currencies)
+        self.symbols = self._limit_symbols(cycles, max_symbols)
+        cycles = [
+            c for c in cycles if all(self.edges[e].symbol in self.symbols for e in c)
+        ]
+        self.cycles = np.array(cycles, dtype=np.int64).reshape(-1, 3)
+        self.weights = np.full(len(self.edges), np.inf)
+        self.log_fees = np.log1p(-np.array(self.fees))
+        edge_cycles: List[List[int]] = [[] for _ in self.edges]
+        for i, cycle in enumerate(cycles):
+            for e in cycle:
+                edge_cycles[e].append(i)
+        self.edge_cycles = [np.array(c, dtype=np.int64) for c in edge_cycles]
+
+    def _add_edge(self, edge: Edge, fee: float) -> int:
+        self._edge_index[(edge.source, edge.target)] = len(self.edges)
+        self._adjacency.setdefault(edge.source, []).append(edge.target)
+        self.edges.append(edge)
+        self.fees.append(fee)
+        return len(self.edges) - 1
+
+    def _find_cycles(self, start_currencies: List[str]) -> List[Tuple[int, int, int]]:
+        cycles = []
+        for a in start_currencies:
+            for b in self._adjacency.get(a, []):
+                for c in self._adjacency.get(b, []):
+                    if c == a or (c, a) not in self._edge_index:
+                        continue
+                    cycles.append(
+                        (
+                            self._edge_index[(a, b)],
+                            self._edge_index[(b, c)],
+                            self._edge_index[(c, a)],
+                        )
+                    )
+        return cycles
+
+    def _limit_symbols(self, cycles, max_symbols: int) -> List[str]:
+        """
+        Keep the symbols that are part of most cycles
+        """
+        counts: Dict[str, int] = {}
+        for cycle in cycles:
+            for e in cycle:
+                symbol = self.edges[e].symbol
+                counts[symbol] = counts.get(symbol, 0) + 1
+        return sorted(counts, key=counts.get, reverse=True)[:max_symbols]  # type: ignore
+
+    def update(self, symbol: str, bid: float, ask: float) -> np.ndarray:
+        """
+        Update the two edges of a market
+        :return: indices of the cycles touching the market
+        """
+        buy, sell = self._market_edges[symbol]
+        self.weights[buy] = math.log(ask) - self.log_fees[buy]
+        self.weights[sell] = -math.log(bid) - self.log_fees[sell]
+        return np.union1d(self.edge_cycles[buy], self.edge_cycles[sell])
+
+    def evaluate(self, cycles: np.ndarray) -> np.ndarray:
+        """
+        :return: rate of return of the given cycles, e.g. 0.002 for 0.2%
+        """
+        return np.expm1(-self.weights[self.cycles[cycles]].sum(axis=1))
+
+
+class TriangularArbitrage:
+    """
+    Looks for profitable triangles on every exchange. Only the cycles touching
+    the market whose order book changed are evaluated on each update.
+    """
+
+    def __init__(self, config, dashboard, exchangeshandler=None) -> None:
+        self._config = config
+        self._triangular_config = self._config.get("triangular", {})
+        self.dashboard = dashboard
+        self.exchangeshandler = exchangeshandler or ExchangesHandler(self._config)
+        self.min_profit = self._triangular_config.get("min_profit", 0.001)
+        start_currencies = self._triangular_config.get("start_currencies", ["USDT"])
+        max_symbols = self._triangular_config.get("max_symbols", 100)
+        self.graphs: Dict[str, CurrencyGraph] = {}
+        for ex, markets in self.exchangeshandler.get_markets().items():
+            self.graphs[ex] = CurrencyGraph(markets, start_currencies, max_symbols)
+            logger.info(
+                f"{ex}: {len(self.graphs[ex].cycles)} triangles over {len(self.graphs[ex].symbols)} symbols"
+            )
+        self.engine = OrderBookEngine(
+            self._config,
+            self.exchangeshandler,
+            {ex: graph.symbols for ex, graph in self.graphs.items()},
+            self._on_order_book,
+            quorum=1,
+        )
+
+    def check_cycles(self, exchange: str, symbol: str, orderbook) -> List[Dict]:
+        graph = self.graphs[exchange]
+        cycles = graph.update(symbol, orderbook.best_bid, orderbook.best_ask)
+        if not len(cycles):
+            return []
+        returns = graph.evaluate(cycles)
+        found = np.flatnonzero(returns > self.min_profit)
+        return [self._describe(graph, cycles[i], returns[i]) for i in found]
+
+    def _describe(self, graph: CurrencyGraph, cycle: int, rate: float) -> Dict:
+        legs = [graph.edges[e] for e in graph.cycles[cycle]]
+        return {
+            "path": " -> ".join([leg.source for leg in legs] + [legs[0].source]),
+            "legs": [{"symbol": leg.symbol, "side": leg.side} for leg in legs],
+            "profit_pct": float(rate) * 100,
+        }
+
+    async def _on_order_book(self, exchange, symbol, exchanges):
+        opportunities = self.check_cycles(
+            exchange, symbol, self.engine.store.get(exchange, symbol)
+        )
+        for opp in opportunities:
+            logger.info(
+                f"Found triangular opportunity on {exchange}: {opp['path']} {opp['profit_pct']:.3f}%"
+            )
+        if opportunities:
+            self.dashboard.update(
+                "profit",
+                (exchange, opportunities),
+                title="Triangular",
+                border_style="red",
+                render=self._opportunities_text,
+            )
+
+    @staticmethod
+    def _opportunities_text(data):
+        exchange, opportunities = data
+        return "\n".join(
+            f"{exchange}: {opp['path']} {opp['profit_pct']:.3f}%"
+            for opp in opportunities
+        )
+
+    def run(self):
+        try:
+            self.exchangeshandler.loop.run_until_complete(self.engine.run())
+        finally:
+            self.exchangeshandler.close()
@@ -1,22 +1,28 @@
 import json
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import TYPE_CHECKING, Any, Dict, List
 
-from rich.table import Table
+if TYPE_CHECKING:
+    from rich.table import Table
 
 
-def generate_table(obs, current_exchanges) -> Table:
-    """Make a new table."""
+def generate_table(quotes) -> "Table":
+    """
+    Make a new table.
+    :param quotes: best bid and ask per exchange as {exchange: (bid, ask)}
+    """
+    from rich.table import Table
+
     table = Table(expand=True)
     table.add_column("Exchange")
     table.add_column("Bids")
     table.add_column("Asks")
 
-    for ex in current_exchanges:
+    for ex, (bid, ask) in quotes.items():
         table.add_row(
             f"{ex}",
-            f'{obs[ex]["bids"][0][0]}',
-            f'{obs[ex]["asks"][0][0]}',
+            f"{bid}",
+            f"{ask}",
         )
     return table
 
@@ -37,14 +43,62 @@ def create_config(file_name: Path) -> None:
         "dry_balance": 1000,
         "amount": 1000,
         "order_size": 1000,
+        "max_pairs": 0,
         "min_profit": 0.01,
         "symbol": "BTC/USDT",
+        "quorum": 2,
+        "max_quote_age": 5,
+        "orderbook_depth": 50,
+        "subscription_batch_size": 50,
+        "balance_reconcile_interval": 60,
         "exchanges": [
             {"name": "binance", "key": "", "secret": ""},
             {"name": "bybit", "key": "", "secret": ""},
             {"name": "kucoin", "key": "", "secret": ""},
             {"name": "okx", "key": "", "secret": ""},
         ],
+        "ledger": {
+            "enabled": True,
+            "path": "ceres.sqlite",
+        },
+        "connections": {
+            "shared": True,
+            "keepalive_timeout": 60,
+            "dns_cache_ttl": 300,
+            "limit": 100,
+            "limit_per_host": 0,
+        },
+        "market_cache": {
+            "enabled": True,
+            "path": "markets_cache.json",
+            "ttl": 3600,
+        },
+        "simulator": {
+            "latency": {"default": {"mean": 0.05, "jitter": 0.02}},
+        },
+        "logging": {
+            "path": "logs.log",
+            "format": "json",
+            "level": "INFO",
+        },
+        "metrics": {
+            "enabled": False,
+            "host": "127.0.0.1",
+            "port": 9108,
+            "log_interval": 60,
+        },
+        "scanner": {
+            "symbols": [],
+            "quote": "USDT",
+            "max_symbols": 200,
+            "min_spread": 0.001,
+            "processes": 1,
+        },
+        "triangular": {
+            "start_currencies": ["USDT"],
+            "max_symbols": 100,
+            "min_profit": 0.001,
+        },
         "telegram": {
             "enabled": False,
             "token": "",
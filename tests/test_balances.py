@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+
+import pytest
+
+from ceres.balances import Balances
+
+
+BUY = {"symbol": "X/Y", "side": "buy", "amount": 2.0, "price": 100.0}
+SELL = {"symbol": "X/Y", "side": "sell", "amount": 2.0, "price": 100.0}
+
+
+def balances(dry=True):
+    config = {"dry": True, "dry_balance": 1000.0, "symbol": "X/Y"}
+    wallets = Balances(config, SimpleNamespace(current_exchanges=["a", "b"]))
+    wallets.dry = dry
+    return wallets
+
+
+def assets(wallets, exchange, currency):
+    asset = wallets.get_asset(exchange, currency)
+    return asset.free, asset.used, asset.total
+
+
+def test_reserve_and_release_buy_with_fee():
+    wallets = balances()
+    reservation = wallets.reserve("a", BUY, fee=0.001)
+    assert reservation == ("a", "Y", pytest.approx(200.2), 0)
+    assert assets(wallets, "a", "Y") == pytest.approx((799.8, 200.2, 1000.0))
+    wallets.release(reservation)
+    assert assets(wallets, "a", "Y") == pytest.approx((1000.0, 0.0, 1000.0))
+
+
+def test_reserve_sell_in_base_currency():
+    wallets = balances()
+    wallets.reserve("b", SELL, fee=0.001)
+    assert assets(wallets, "b", "X") == pytest.approx((998.0, 2.0, 1000.0))
+    assert assets(wallets, "b", "Y") == (1000.0, 0, 1000.0)
+
+
+def test_apply_fill_books_both_currencies():
+    wallets = balances()
+    wallets.apply_fill("a", "X/Y", "buy", 2.0, 100.0, fee=0.2)
+    wallets.apply_fill("b", "X/Y", "sell", 2.0, 101.0, fee=0.2)
+    assert wallets.get_total("a", "X") == pytest.approx(1002.0)
+    assert wallets.get_total("a", "Y") == pytest.approx(799.8)
+    assert wallets.get_total("b", "X") == pytest.approx(998.0)
+    assert wallets.get_total("b", "Y") == pytest.approx(1201.8)
+    assert wallets.get_exchanges_total("X") == pytest.approx(2000.0)
+
+
+def test_unchanged_snapshot_books_order_locally():
+    wallets = balances(dry=False)
+    reservation = wallets.reserve("a", BUY)
+    wallets.release(reservation)
+    wallets.apply_fill("a", "X/Y", "buy", 2.0, 100.0, snapshot=reservation[3])
+    assert assets(wallets, "a", "Y") == pytest.approx((800.0, 0.0, 800.0))
+    assert wallets.get_free("a", "X") == pytest.approx(1002.0)
+
+
+def test_newer_snapshot_replaces_order_in_flight():
+    wallets = balances(dry=False)
+    reservation = wallets.reserve("a", BUY)
+    # the exchange reports a balance that already contains the fill
+    snapshot = {
+        "X": {"free": 1002.0, "used": 0.0, "total": 1002.0},
+        "Y": {"free": 800.0, "used": 0.0, "total": 800.0},
+    }
+    wallets._set_balance("a", snapshot)
+    assert wallets.snapshot("a") == reservation[3] + 1
+    wallets.release(reservation)
+    wallets.apply_fill("a", "X/Y", "buy", 2.0, 100.0, snapshot=reservation[3])
+    assert assets(wallets, "a", "Y") == (800.0, 0.0, 800.0)
+    assert assets(wallets, "a", "X") == (1002.0, 0.0, 1002.0)
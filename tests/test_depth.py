@@ -0,0 +1,102 @@
+import random
+
+import numpy as np
+import pytest
+
+from ceres.depth import Execution, best_execution, levels
+
+
+def walk_cost(side, amount):
+    cost, left = 0.0, amount
+    for price, size in side:
+        take = min(size, left)
+        cost += take * price
+        left -= take
+    return cost
+
+
+def profit_of(asks, bids, buy_fee, sell_fee, amount):
+    return walk_cost(bids, amount) * (1 - sell_fee) - walk_cost(asks, amount) * (
+        1 + buy_fee
+    )
+
+
+def test_best_execution_stops_at_last_profitable_level():
+    asks = levels([[100.0, 1.0], [101.0, 1.0], [103.0, 5.0]])
+    bids = levels([[102.0, 1.5], [101.5, 1.0], [99.0, 5.0]])
+    execution = best_execution(asks, bids, 0.0, 0.0)
+    assert execution.amount == pytest.approx(2.0)
+    assert execution.buy_price == 101.0
+    assert execution.sell_price == 101.5
+    assert execution.buy_vwap == pytest.approx(100.5)
+    assert execution.sell_vwap == pytest.approx((1.5 * 102.0 + 0.5 * 101.5) / 2)
+    assert execution.profit == pytest.approx(1.0 * 2.0 + 0.5 * 1.0 + 0.5 * 0.5)
+
+
+def test_best_execution_includes_fees():
+    asks = levels([[100.0, 1.0]])
+    bids = levels([[100.5, 1.0]])
+    assert best_execution(asks, bids, 0.0, 0.0).profit == pytest.approx(0.5)
+    execution = best_execution(asks, bids, 0.001, 0.001)
+    assert execution.profit == pytest.approx(100.5 * 0.999 - 100.0 * 1.001)
+    assert execution.buy_fee == pytest.approx(0.1)
+    assert execution.sell_fee == pytest.approx(0.1005)
+    assert best_execution(asks, bids, 0.003, 0.003) == Execution()
+
+
+def test_best_execution_without_overlap_or_books():
+    asks = levels([[101.0, 1.0]])
+    bids = levels([[100.0, 1.0]])
+    assert best_execution(asks, bids, 0.0, 0.0) == Execution()
+    assert best_execution(levels([]), bids, 0.0, 0.0) == Execution()
+    assert best_execution(asks, levels([]), 0.0, 0.0) == Execution()
+
+
+def test_best_execution_max_amount_and_step():
+    asks = levels([[100.0, 1.0], [100.5, 2.0]])
+    bids = levels([[102.0, 3.0]])
+    execution = best_execution(asks, bids, 0.0, 0.0, max_amount=1.37)
+    assert execution.amount == pytest.approx(1.37)
+    assert execution.buy_price == 100.5
+    assert execution.profit == pytest.approx(2.0 + 0.37 * 1.5)
+    execution = best_execution(asks, bids, 0.0, 0.0, 1.37, amount_step=0.25)
+    assert execution.amount == pytest.approx(1.25)
+    assert execution.profit == pytest.approx(2.0 + 0.25 * 1.5)
+    execution = best_execution(asks, bids, 0.0, 0.0, 0.9, amount_step=0.25)
+    assert execution.amount == pytest.approx(0.75)
+    assert execution.buy_price == 100.0
+    assert best_execution(asks, bids, 0.0, 0.0, 0.2, amount_step=0.25) == Execution()
+
+
+def test_best_execution_is_optimal():
+    rng = random.Random(3)
+    for _ in range(200):
+        asks = np.cumsum(rng.choices([0.1, 0.5, 1.0], k=6))
+        asks = levels([[99.0 + p, rng.uniform(0.1, 2)] for p in asks])
+        bids = np.cumsum(rng.choices([0.1, 0.5, 1.0], k=6))
+        bids = levels([[101.0 - p, rng.uniform(0.1, 2)] for p in bids])
+        execution = best_execution(asks, bids, 0.001, 0.002)
+        if execution.amount:
+            assert execution.profit == pytest.approx(
+                profit_of(asks, bids, 0.001, 0.002, execution.amount)
+            )
+        cap = min(asks[:, 1].sum(), bids[:, 1].sum())
+        for amount in np.linspace(0, cap, 50)[1:]:
+            profit = profit_of(asks, bids, 0.001, 0.002, amount)
+            assert profit <= max(execution.profit, 0) + 1e-9
+
+
+def test_best_execution_budget_at_limit_price():
+    asks = levels([[100.0, 1.0], [101.0, 1.0]])
+    bids = levels([[105.0, 5.0]])
+    execution = best_execution(asks, bids, 0.001, 0.001, budget=150.0)
+    assert execution.buy_price == 101.0
+    assert execution.amount == pytest.approx(150.0 / (101.0 * 1.001))
+    # a budget that does not reach the second level stays at the first
+    execution = best_execution(asks, bids, 0.001, 0.001, budget=100.0)
+    assert execution.buy_price == 100.0
+    assert execution.amount == pytest.approx(100.0 / 100.1)
+    # limits rounded up to the tick are paid at the rounded price
+    asks = levels([[100.03, 1.0], [101.03, 1.0]])
+    execution = best_execution(asks, bids, 0.0, 0.0, budget=150.0, price_tick=0.1)
+    assert execution.amount == pytest.approx(150.0 / 101.1)
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from ceres.exchange import exchangehelpers
+from ceres.exchange.exchangehelpers import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    retrier,
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(exchangehelpers.time, "monotonic", lambda: now[0])
+    return now
+
+
+def open_breaker(failures=3):
+    breaker = CircuitBreaker("a", RetryPolicy(failure_threshold=3, reset_timeout=30))
+    for _ in range(failures):
+        assert breaker.allow()
+        breaker.record_failure("network")
+    return breaker
+
+
+def test_breaker_opens_half_opens_and_closes(clock):
+    breaker = open_breaker(2)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure("network")
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.is_open
+    assert not breaker.allow()
+    assert breaker.retry_after() == pytest.approx(30)
+    clock[0] += 30
+    assert not breaker.is_open
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+    assert breaker.metrics["opened"] == 1
+    assert breaker.metrics["rejected"] == 1
+
+
+def test_half_open_lets_one_trial_through(clock):
+    breaker = open_breaker()
+    clock[0] += 30
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure("network")
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.retry_after() == pytest.approx(30)
+    assert breaker.metrics["opened"] == 2
+
+
+def test_fatal_errors_do_not_open_the_circuit(clock):
+    breaker = CircuitBreaker("a", RetryPolicy(failure_threshold=1))
+    breaker.record_failure("fatal")
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.metrics["fatal"] == 1
+
+
+def test_cancelled_trial_lets_the_next_call_through(clock):
+    class Client:
+        retry_policy = RetryPolicy(failure_threshold=3, reset_timeout=30)
+
+        def __init__(self):
+            self.breaker = open_breaker()
+
+        @retrier
+        async def call(self, result):
+            if result is None:
+                await asyncio.sleep(10)
+            return result
+
+    async def run(client):
+        task = asyncio.ensure_future(client.call(None))
+        await asyncio.sleep(0)
+        with pytest.raises(CircuitOpenError):
+            await client.call(1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return await client.call(2)
+
+    client = Client()
+    clock[0] += 30
+    assert asyncio.run(run(client)) == 2
+    assert client.breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from ceres.exchange.markettable import MarketRules, MarketTable
+from ceres.exchange.simulator import FillSimulator
+from ceres.execution import OrderExecutor
+
+
+SYMBOL = "X/Y"
+# a has little depth at the buy limit, b takes the whole sell
+BOOKS = {
+    "a": {"asks": [[100.0, 0.4], [102.0, 5.0]], "bids": [[99.0, 5.0]]},
+    "b": {"asks": [[101.5, 5.0]], "bids": [[101.0, 5.0]]},
+}
+
+
+def executor(action, rules=None, books=BOOKS):
+    simulator = FillSimulator(
+        {"simulator": {"latency": {"default": {"mean": 0, "jitter": 0}}}},
+        lambda ex, symbol: books[ex],
+        {},
+    )
+    exchanges = {
+        ex: SimpleNamespace(
+            create_order=lambda ex=ex, **order: simulator.create_order(ex, **order),
+            cancel_order=None,
+        )
+        for ex in BOOKS
+    }
+    table = None
+    if rules is not None:
+        table = MarketTable.__new__(MarketTable)
+        table._rules = {(ex, SYMBOL): rules for ex in BOOKS}
+        table._common_steps = {}
+    return OrderExecutor(
+        {"partial_fill_action": action},
+        SimpleNamespace(exchanges=exchanges),
+        table,
+    )
+
+
+def orders(amount, sell_amount=None):
+    return {
+        "exchange_orders": {
+            "a": {
+                "symbol": SYMBOL,
+                "type": "limit",
+                "side": "buy",
+                "amount": amount,
+                "price": 100.0,
+            },
+            "b": {
+                "symbol": SYMBOL,
+                "type": "limit",
+                "side": "sell",
+                "amount": amount if sell_amount is None else sell_amount,
+                "price": 101.0,
+            },
+        }
+    }
+
+
+def execute(executor, orders):
+    return asyncio.run(executor.execute(orders))
+
+
+def test_even_fills_need_no_correction():
+    results = execute(executor("unwind"), orders(0.3))
+    assert [leg.filled for leg in results] == [0.3, 0.3]
+    assert not any(leg.corrective for leg in results)
+
+
+@pytest.mark.parametrize(
+    "action, exchange, side",
+    [("unwind", "b", "buy"), ("hedge", "a", "buy")],
+)
+def test_partial_fill_is_corrected(action, exchange, side):
+    buy, sell, correction = execute(executor(action), orders(1.0))
+    assert buy.filled == pytest.approx(0.4)
+    assert sell.filled == pytest.approx(1.0)
+    assert correction.corrective
+    assert correction.exchange == exchange
+    assert correction.order["side"] == side
+    assert correction.order["type"] == "market"
+    assert correction.filled == pytest.approx(0.6)
+
+
+def test_correction_is_rounded_to_amount_step(caplog):
+    caplog.set_level(logging.INFO)
+    buy, sell, correction = execute(
+        executor("unwind", MarketRules(amount_step=0.01)), orders(1.0, 1.005)
+    )
+    assert correction.order["amount"] == pytest.approx(0.6)
+    assert correction.filled == pytest.approx(0.6)
+    assert "stays as dust" in caplog.text
+    assert not [r for r in caplog.records if r.levelno >= logging.ERROR]
+
+
+def test_imbalance_below_amount_step_is_left_as_dust(caplog):
+    results = execute(
+        executor("unwind", MarketRules(amount_step=0.01)), orders(0.3, 0.305)
+    )
+    assert len(results) == 2
+    assert not [r for r in caplog.records if r.levelno >= logging.ERROR]
+
+
+def test_invalid_correction_is_not_sent(caplog):
+    results = execute(
+        executor("unwind", MarketRules(amount_step=0.01, min_cost=100.0)),
+        orders(1.0),
+    )
+    assert len(results) == 2
+    assert "order invalid" in caplog.text
+
+
+def test_unfilled_correction_reports_exposure(caplog):
+    books = {**BOOKS, "b": {**BOOKS["b"], "asks": [[101.5, 0.2]]}}
+    *_, correction = execute(executor("unwind", books=books), orders(1.0))
+    assert correction.filled == pytest.approx(0.2)
+    assert "open exposure" in caplog.text
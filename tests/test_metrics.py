@@ -0,0 +1,41 @@
+import pytest
+
+from ceres.metrics import LatencyHistogram
+
+
+@pytest.fixture(params=[8, 32])
+def histogram(request):
+    return LatencyHistogram(sub_buckets=request.param, max_exponent=20)
+
+
+def test_index_is_exact_for_small_values(histogram):
+    for value in range(2 * histogram.sub_buckets):
+        assert histogram._index(value) == value
+        assert histogram._lower_bound(value) == value
+
+
+def test_index_bucket_bounds_the_value(histogram):
+    for value in range(1, histogram._max_value + 1, 7):
+        index = histogram._index(value)
+        low = histogram._lower_bound(index)
+        high = histogram._lower_bound(index + 1)
+        assert low <= value < high
+        assert (value - low) / value < 1 / histogram.sub_buckets
+
+
+def test_index_buckets_are_contiguous(histogram):
+    indexes = [histogram._index(v) for v in range(histogram._max_value + 1)]
+    assert all(b - a in (0, 1) for a, b in zip(indexes, indexes[1:]))
+    assert indexes[-1] == len(histogram.counts) - 1
+
+
+def test_percentile():
+    histogram = LatencyHistogram()
+    for us in range(1, 1001):
+        histogram.record(us / 1e6)
+    histogram.record(-1.0)
+    assert histogram.count == 1001
+    assert histogram.percentile(50) == pytest.approx(500e-6, rel=1 / 32)
+    assert histogram.percentile(99) == pytest.approx(990e-6, rel=1 / 32)
+    assert histogram.percentile(100) <= histogram.max
+    assert LatencyHistogram().percentile(50) == 0.0
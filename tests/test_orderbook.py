@@ -0,0 +1,76 @@
+import random
+
+import numpy as np
+import pytest
+
+from ceres.orderbook import OrderBookSide
+
+
+def sides(depth, is_bid):
+    return [
+        OrderBookSide(depth, is_bid),
+        OrderBookSide(depth, is_bid, price_tick=0.01, amount_step=0.001),
+    ]
+
+
+@pytest.mark.parametrize("side", sides(5, is_bid=False), ids=["float", "fixed"])
+def test_apply_asks(side):
+    side.set([[101.0, 1.0], [103.0, 2.0]])
+    side.apply(102.0, 0.5)
+    side.apply(100.0, 3.0)
+    side.apply(103.0, 2.5)
+    side.apply(101.0, 0)
+    np.testing.assert_allclose(
+        side.levels(), [[100.0, 3.0], [102.0, 0.5], [103.0, 2.5]]
+    )
+    assert side.best_price() == pytest.approx(100.0)
+
+
+@pytest.mark.parametrize("side", sides(5, is_bid=True), ids=["float", "fixed"])
+def test_apply_bids(side):
+    side.set([[99.0, 1.0], [97.0, 2.0]])
+    side.apply(98.0, 0.5)
+    side.apply(100.0, 3.0)
+    side.apply(97.0, 2.5)
+    side.apply(99.0, 0)
+    np.testing.assert_allclose(side.levels(), [[100.0, 3.0], [98.0, 0.5], [97.0, 2.5]])
+    assert side.best_price() == pytest.approx(100.0)
+
+
+@pytest.mark.parametrize("is_bid", [False, True])
+def test_apply_full_side_drops_worst_level(is_bid):
+    side = OrderBookSide(2, is_bid)
+    sign = -1 if is_bid else 1
+    side.set([[100.0, 1.0], [100.0 + sign, 1.0]])
+    side.apply(100.0 + 2 * sign, 1.0)
+    np.testing.assert_allclose(side.levels()[:, 0], [100.0, 100.0 + sign])
+    side.apply(100.0 - sign, 1.0)
+    np.testing.assert_allclose(side.levels()[:, 0], [100.0 - sign, 100.0])
+
+
+def test_apply_remove_missing_level_is_ignored():
+    side = OrderBookSide(3, False)
+    side.set([[101.0, 1.0]])
+    side.apply(102.0, 0)
+    np.testing.assert_allclose(side.levels(), [[101.0, 1.0]])
+
+
+@pytest.mark.parametrize("is_bid", [False, True])
+def test_apply_matches_reference(is_bid):
+    depth = 8
+    rng = random.Random(7)
+    side = OrderBookSide(depth, is_bid, price_tick=0.5, amount_step=0.25)
+    book = {}
+    for _ in range(2000):
+        price = 100 + rng.randint(-20, 20) * 0.5
+        amount = rng.choice([0, 0, 0.25, 1.0, 2.5])
+        side.apply(price, amount)
+        if amount:
+            book[price] = amount
+        else:
+            book.pop(price, None)
+        # levels beyond the depth are dropped for good
+        best = sorted(book.items(), reverse=is_bid)[:depth]
+        book = dict(best)
+        expected = np.array(best, dtype=float).reshape(-1, 2)
+        np.testing.assert_allclose(side.levels(), expected)
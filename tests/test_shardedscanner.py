@@ -0,0 +1,21 @@
+from ceres.shardedscanner import shard_subscriptions
+
+
+def test_shard_subscriptions_spreads_symbols():
+    shards = shard_subscriptions({"a": ["X", "Y", "Z"], "b": ["X", "Y"]}, 2)
+    assert {"a": ["X", "Y", "Z"]} in shards
+    assert {"b": ["X", "Y"]} in shards
+    assert len(shards) == 2
+
+
+def test_shard_subscriptions_splits_exchanges_for_more_processes():
+    shards = shard_subscriptions({"a": ["W", "X", "Y", "Z"]}, 2)
+    assert sorted(shard["a"] for shard in shards) == [["W", "X"], ["Y", "Z"]]
+
+
+def test_shard_subscriptions_skips_exchanges_without_symbols():
+    assert shard_subscriptions({"a": ["X", "Y"], "b": []}, 2) == [
+        {"a": ["X"]},
+        {"a": ["Y"]},
+    ]
+    assert shard_subscriptions({"a": []}, 2) == []
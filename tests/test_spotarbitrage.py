@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from ceres.depth import buy_cost
+from ceres.exchange.markettable import MarketRules, MarketTable
+from ceres.spotarbitrage import SpotArbitrage
+
+
+def strategy(free, rules=None):
+    s = SpotArbitrage.__new__(SpotArbitrage)
+    s.symbol, s.base, s.quote = "X/Y", "X", "Y"
+    s.order_size = 0
+    s.max_pairs = 0
+    s.fees = {"a": {"taker": 0.001}, "b": {"taker": 0.001}}
+    s.wallets = SimpleNamespace(get_free=lambda ex, c: free.get((ex, c), 0.0))
+    s.market_table = MarketTable.__new__(MarketTable)
+    s.market_table._rules = rules or {}
+    s.market_table._common_steps = {}
+    s.orderbooks = {
+        "a": {"asks": [[100.0, 1.0], [101.0, 1.0]], "bids": [[99.0, 1.0]]},
+        "b": {"asks": [[110.0, 1.0]], "bids": [[105.0, 5.0]]},
+    }
+    return s
+
+
+def allocate(s):
+    spreads = np.array([[-np.inf, 1.0], [-np.inf, -np.inf]])
+    return s.allocate(["a", "b"], spreads)
+
+
+@pytest.mark.parametrize("step", [None, 0.01])
+def test_allocate_buy_is_affordable_at_limit_price(step):
+    free = 150.0
+    rules = {("a", "X/Y"): MarketRules(amount_step=step)} if step else None
+    s = strategy({("a", "Y"): free, ("b", "X"): 10.0}, rules)
+    [(buy_ex, sell_ex, execution)] = allocate(s)
+    assert (buy_ex, sell_ex) == ("a", "b")
+    # the walk reaches the second level, so the limit is above the vwap
+    assert execution.buy_price == 101.0
+    assert execution.amount > 1.0
+    assert buy_cost(execution.amount, execution.buy_price, 0.001) <= free
+
+
+def test_allocate_without_balance_skips_pair():
+    s = strategy({("b", "X"): 10.0})
+    assert allocate(s) == []